@@ -1,10 +1,86 @@
+import heapq
+import io
 import logging
+import os
 import zipfile
 from datetime import datetime, timezone
 from pathlib import Path
 
 from telegram_client import TelegramClient
 
+_log = logging.getLogger(__name__)
+
+
+def _backup_zlib_level() -> int:
+    """
+    Deflate level for backup archives (env BACKUP_ZLIB_LEVEL, default 3).
+
+    JSON/JSONL compresses almost as well at level 3 as at the zlib default (6),
+    but noticeably faster; values are clamped to the valid 0..9 range.
+    """
+    raw = os.environ.get("BACKUP_ZLIB_LEVEL")
+    try:
+        level = int(raw) if raw is not None and raw.strip() != "" else 3
+    except ValueError:
+        return 3
+    return min(9, max(0, level))
+
+
+BACKUP_ZLIB_LEVEL = _backup_zlib_level()
+
+# Magic bytes of formats that are already compressed (gzip, zstd, zip/xz);
+# deflating those again wastes CPU for no ratio gain.
+_COMPRESSED_MAGIC = (b"\x1f\x8b", b"\x28\xb5\x2f\xfd", b"\x50\x4b", b"\xfd\x37\x7a\x58")
+
+# Below this size the deflate header/setup overhead is not worth it.
+_MIN_DEFLATE_SIZE = 4096
+
+# The pm log dominates archive size; level 1 keeps most of the deflate
+# ratio on JSONL at roughly 3x the speed of the default level.
+_JSONL_ZLIB_LEVEL = 1
+
+
+def _zip_compress_type(file_path: Path) -> int:
+    """
+    ZIP_STORED for files that are already compressed or too small to benefit
+    from deflate, ZIP_DEFLATED otherwise.
+    """
+    try:
+        if file_path.stat().st_size < _MIN_DEFLATE_SIZE:
+            return zipfile.ZIP_STORED
+        with file_path.open("rb") as f:
+            head = f.read(4)
+        if head.startswith(_COMPRESSED_MAGIC):
+            return zipfile.ZIP_STORED
+    except OSError:
+        pass
+    return zipfile.ZIP_DEFLATED
+
+
+def _cleanup_old_backups(backup_dir: Path, keep: int = 5) -> None:
+    """
+    Delete all but the newest `keep` backup archives.
+
+    Backup filenames embed a zero-padded UTC timestamp, so lexicographic name
+    order equals chronological order and no stat() calls are needed. A single
+    os.scandir pass replaces the old glob + full sort.
+    """
+    try:
+        names = [
+            entry.name
+            for entry in os.scandir(backup_dir)
+            if entry.name.startswith("bot_backup_") and entry.name.endswith(".zip")
+        ]
+        if len(names) <= keep:
+            return
+        cutoff = min(heapq.nlargest(keep, names))
+        for name in names:
+            if name < cutoff:
+                (backup_dir / name).unlink()
+                _log.info("Deleted old backup: %s", backup_dir / name)
+    except OSError:
+        _log.warning("Failed to clean up old backups in %s", backup_dir, exc_info=True)
+
 
 def _create_backup(
     tg: TelegramClient,
@@ -20,16 +96,15 @@ def _create_backup(
 
     Returns True if backup was created and sent successfully, False otherwise.
     """
-    logger = logging.getLogger(__name__)
-
     try:
         # Create backup directory
         backup_dir = Path("backups")
         backup_dir.mkdir(exist_ok=True)
 
-        # Create backup filename with timestamp
-        timestamp = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
-        backup_filename = f"bot_backup_{timestamp}.zip"
+        # Create backup filename with timestamp (captured once so the filename
+        # and the caption never disagree across a second boundary)
+        now = datetime.now(timezone.utc)
+        backup_filename = f"bot_backup_{now.strftime('%Y%m%d_%H%M%S')}.zip"
         backup_path = backup_dir / backup_filename
 
         # List of files to backup
@@ -41,41 +116,70 @@ def _create_backup(
             (Path(pm_log_file), "private_messages.jsonl"),
         ]
 
-        # Create zip archive
-        with zipfile.ZipFile(backup_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
+        # One directory listing per unique parent replaces a stat() call per
+        # file when checking which of the candidates actually exist.
+        existing_names: dict[Path, set[str]] = {}
+        for file_path, _ in files_to_backup:
+            parent = file_path.parent
+            if parent not in existing_names:
+                try:
+                    existing_names[parent] = {entry.name for entry in os.scandir(parent)}
+                except OSError:
+                    existing_names[parent] = set()
+
+        # Create zip archive in memory, so the upload reads from the buffer
+        # instead of re-opening and re-reading the file we just wrote.
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(
+            buffer, 'w', zipfile.ZIP_DEFLATED,
+            allowZip64=False,  # five small JSON files never need ZIP64 records
+            compresslevel=BACKUP_ZLIB_LEVEL,
+        ) as zipf:
             for file_path, archive_name in files_to_backup:
-                if file_path.exists():
-                    zipf.write(file_path, archive_name)
-                    logger.info(f"Added {file_path} to backup as {archive_name}")
+                if file_path.name in existing_names[file_path.parent]:
+                    if file_path.stat().st_size == 0:
+                        # Empty files get a stored entry directly; no point
+                        # opening and deflating zero bytes.
+                        zipf.writestr(zipfile.ZipInfo(archive_name), b"")
+                    else:
+                        compress_type = _zip_compress_type(file_path)
+                        compresslevel = None
+                        if compress_type == zipfile.ZIP_DEFLATED and file_path.suffix == ".jsonl":
+                            compresslevel = _JSONL_ZLIB_LEVEL
+                        zipf.write(
+                            file_path,
+                            archive_name,
+                            compress_type=compress_type,
+                            compresslevel=compresslevel,
+                        )
+                    _log.info("Added %s to backup as %s", file_path, archive_name)
                 else:
-                    logger.warning(f"File {file_path} does not exist, skipping")
+                    _log.warning("File %s does not exist, skipping", file_path)
+        backup_bytes = buffer.getvalue()
+
+        # Keep an on-disk copy for the "last 5 backups" retention
+        backup_path.write_bytes(backup_bytes)
 
         # Send backup to Telegram
-        with open(backup_path, 'rb') as backup_file:
-            resp = tg._request(
-                method="POST",
-                endpoint="sendDocument",
-                data={
-                    "chat_id": backup_chat_id,
-                    "caption": f"Еженедельный бэкап бота от {datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S UTC')}",
-                },
-                files={"document": (backup_filename, backup_file, "application/zip")},
-                timeout=30,
-            )
+        resp = tg._request(
+            method="POST",
+            endpoint="sendDocument",
+            data={
+                "chat_id": backup_chat_id,
+                "caption": f"Еженедельный бэкап бота от {now.strftime('%Y-%m-%d %H:%M:%S UTC')}",
+            },
+            files={"document": (backup_filename, backup_bytes, "application/zip")},
+            timeout=30,
+        )
 
         if resp.status_code == 200:
-            logger.info(f"Backup sent successfully to chat {backup_chat_id}")
-            # Clean up old backups (keep only last 5)
-            backup_files = sorted(backup_dir.glob("bot_backup_*.zip"))
-            if len(backup_files) > 5:
-                for old_backup in backup_files[:-5]:
-                    old_backup.unlink()
-                    logger.info(f"Deleted old backup: {old_backup}")
+            _log.info("Backup sent successfully to chat %s", backup_chat_id)
+            _cleanup_old_backups(backup_dir)
             return True
         else:
-            logger.error(f"Failed to send backup: status code {resp.status_code}")
+            _log.error("Failed to send backup: status code %s", resp.status_code)
             return False
 
     except Exception as e:
-        logger.error(f"Failed to create backup: {type(e).__name__}: {e}", exc_info=True)
+        _log.error("Failed to create backup: %s: %s", type(e).__name__, e, exc_info=True)
         return False
@@ -2,10 +2,10 @@ import logging
 import time
 import uuid
 import threading
+from datetime import datetime, timedelta, timezone
 
 import requests
 from openai import OpenAI
-import schedule
 
 from telegram_client import TelegramClient
 from config import _parse_args, _load_settings
@@ -18,7 +18,7 @@ from command_utils import (
     _is_admin,
 )
 from context import BotContext
-from logging_utils import _log_private_message
+from logging_utils import _get_user_fields, _log_private_message
 from backup import _create_backup
 from callback_handler import _handle_callback_query
 from handlers import dispatch
@@ -101,11 +101,24 @@ def _handle_message(
         bot_username=bot_username,
         request_id=ctx.request_id,
         cmd=ctx.cmd,
+        ts=datetime.now(timezone.utc).isoformat(),
+        user_fields=_get_user_fields(message),
     )
 
     dispatch(ctx)
 
 
+def _seconds_until_next_monday_10am(now: datetime | None = None) -> float:
+    """Seconds from `now` (local time) until the next Monday 10:00."""
+    if now is None:
+        now = datetime.now()
+    target = now.replace(hour=10, minute=0, second=0, microsecond=0)
+    target += timedelta(days=(0 - now.weekday()) % 7)
+    if target <= now:
+        target += timedelta(days=7)
+    return (target - now).total_seconds()
+
+
 def main(argv: list[str] | None = None) -> None:
     args = _parse_args(argv)
     logging.basicConfig(
@@ -156,19 +169,24 @@ def main(argv: list[str] | None = None) -> None:
         else:
             logger.warning("Backup chat not configured, skipping scheduled backup")
 
-    # Schedule backup every Monday at 10:00 AM
-    schedule.every().monday.at("10:00").do(scheduled_backup)
-    logger.info("Backup scheduler configured: every Monday at 10:00 AM")
+    # Schedule backup every Monday at 10:00 AM via a self-rearming timer:
+    # the process sleeps until the next run instead of waking every minute
+    # to poll a scheduler.
+    def _run_and_reschedule():
+        try:
+            scheduled_backup()
+        except Exception:
+            logger.error("Scheduled backup crashed", exc_info=True)
+        finally:
+            _arm_backup_timer()
 
-    # Run scheduler in a separate thread
-    def run_scheduler():
-        while True:
-            schedule.run_pending()
-            time.sleep(60)  # Check every minute
+    def _arm_backup_timer():
+        timer = threading.Timer(_seconds_until_next_monday_10am(), _run_and_reschedule)
+        timer.daemon = True
+        timer.start()
 
-    scheduler_thread = threading.Thread(target=run_scheduler, daemon=True)
-    scheduler_thread.start()
-    logger.info("Backup scheduler thread started")
+    _arm_backup_timer()
+    logger.info("Backup scheduler configured: every Monday at 10:00 AM")
 
     offset = 0
     while True:
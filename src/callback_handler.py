@@ -1,5 +1,5 @@
-import json
 import logging
+import time
 from typing import Any, Dict
 
 from telegram_client import TelegramClient
@@ -9,13 +9,72 @@ from data.quiz import (
     _QUIZ_WIZARD_STATE,
     _is_hidden_quiz,
     _load_quizzes,
+    _quiz_index,
     _save_quizzes,
     _load_quiz_state,
     _save_quiz_state,
     _get_user_quiz_state,
+    _sid,
 )
+from handlers.quiz import _quiz_buttons_row, _quiz_card_text
+from logging_utils import _pm_user_ids
+from membership import _filter_course_members
 from text_format import _send_with_formatting_fallback
 
+_log = logging.getLogger(__name__)
+
+# Per-user sliding-window counters for callback presses; non-admins over
+# the limit are dropped before any file loads or API calls.
+_CB_LIMIT: dict[int, tuple[int, float]] = {}
+_CB_LIMIT_WINDOW = 1.0
+_CB_LIMIT_MAX = 5
+
+
+def _cb_rate_limited(user_id: int) -> bool:
+    now = time.monotonic()
+    count, start = _CB_LIMIT.get(user_id, (0, now))
+    if now - start >= _CB_LIMIT_WINDOW:
+        count, start = 0, now
+    count += 1
+    _CB_LIMIT[user_id] = (count, start)
+    if len(_CB_LIMIT) > 1024:
+        cutoff = now - _CB_LIMIT_WINDOW
+        for uid in [uid for uid, (_, ts) in _CB_LIMIT.items() if ts < cutoff]:
+            del _CB_LIMIT[uid]
+    return count > _CB_LIMIT_MAX
+
+
+# callback_data prefix -> internal action name
+_CB_ACTIONS = {
+    "quiz_send_all": "send_all",
+    "quiz_send_admins": "send_admins",
+    "quiz_toggle_hidden": "toggle_hidden",
+    "quiz_edit": "edit",
+}
+
+
+def _page_quiz_ids(msg: Dict[str, Any]) -> list[str]:
+    """
+    Quiz ids shown on a /quiz_list page, recovered from the callback_data
+    of the page's own inline keyboard (in display order).
+    """
+    markup = msg.get("reply_markup") or {}
+    keyboard = markup.get("inline_keyboard") if isinstance(markup, dict) else None
+    qids: list[str] = []
+    if not isinstance(keyboard, list):
+        return qids
+    for row in keyboard:
+        if not isinstance(row, list):
+            continue
+        for button in row:
+            if not isinstance(button, dict):
+                continue
+            prefix, sep, rest = str(button.get("callback_data") or "").partition(":")
+            qid = rest.strip()
+            if sep and prefix in _CB_ACTIONS and qid and qid not in qids:
+                qids.append(qid)
+    return qids
+
 
 def _handle_callback_query(
     tg: TelegramClient,
@@ -35,6 +94,8 @@ def _handle_callback_query(
     data = str(callback_query.get("data") or "")
 
     if not is_admin:
+        if _cb_rate_limited(user_id):
+            return
         try:
             tg.answer_callback_query(
                 callback_query_id=callback_query_id,
@@ -42,49 +103,34 @@ def _handle_callback_query(
                 show_alert=True,
             )
         except Exception:
-            logging.getLogger(__name__).debug("Failed to answer callback_query", exc_info=True)
+            _log.debug("Failed to answer callback_query", exc_info=True)
         return
 
-    action = ""
-    quiz_id = ""
-    if data.startswith("quiz_send_all:"):
-        action = "send_all"
-        quiz_id = data.split(":", 1)[1].strip()
-    elif data.startswith("quiz_send_admins:"):
-        action = "send_admins"
-        quiz_id = data.split(":", 1)[1].strip()
-    elif data.startswith("quiz_toggle_hidden:"):
-        action = "toggle_hidden"
-        quiz_id = data.split(":", 1)[1].strip()
-    elif data.startswith("quiz_edit:"):
-        action = "edit"
-        quiz_id = data.split(":", 1)[1].strip()
-    else:
+    prefix, sep, rest = data.partition(":")
+    action = _CB_ACTIONS.get(prefix, "") if sep else ""
+    quiz_id = rest.strip()
+    if not action:
         try:
             tg.answer_callback_query(callback_query_id=callback_query_id, text="Неизвестная кнопка.")
         except Exception:
-            logging.getLogger(__name__).debug("Failed to answer callback_query", exc_info=True)
+            _log.debug("Failed to answer callback_query", exc_info=True)
         return
 
     if not quiz_id:
         try:
             tg.answer_callback_query(callback_query_id=callback_query_id, text="Некорректный quiz_id.")
         except Exception:
-            logging.getLogger(__name__).debug("Failed to answer callback_query", exc_info=True)
+            _log.debug("Failed to answer callback_query", exc_info=True)
         return
 
     quizzes = _load_quizzes(quizzes_file)
-    quiz: Dict[str, Any] | None = None
-    for q in quizzes:
-        if str(q.get("id") or "") == quiz_id:
-            quiz = q
-            break
+    quiz = _quiz_index(quizzes).get(quiz_id)
 
     if quiz is None:
         try:
             tg.answer_callback_query(callback_query_id=callback_query_id, text="Квиз не найден.", show_alert=True)
         except Exception:
-            logging.getLogger(__name__).debug("Failed to answer callback_query", exc_info=True)
+            _log.debug("Failed to answer callback_query", exc_info=True)
         return
 
     if action == "edit":
@@ -92,7 +138,7 @@ def _handle_callback_query(
         try:
             tg.answer_callback_query(callback_query_id=callback_query_id, text="Редактирование запущено.")
         except Exception:
-            logging.getLogger(__name__).debug("Failed to answer callback_query", exc_info=True)
+            _log.debug("Failed to answer callback_query", exc_info=True)
 
         msg = callback_query.get("message") or {}
         if isinstance(msg, dict):
@@ -111,7 +157,7 @@ def _handle_callback_query(
         try:
             _save_quizzes(quizzes_file=quizzes_file, quizzes=quizzes)
         except Exception:
-            logging.getLogger(__name__).warning("Failed to save quizzes file %s", quizzes_file, exc_info=True)
+            _log.warning("Failed to save quizzes file %s", quizzes_file, exc_info=True)
             try:
                 tg.answer_callback_query(
                     callback_query_id=callback_query_id,
@@ -119,7 +165,7 @@ def _handle_callback_query(
                     show_alert=True,
                 )
             except Exception:
-                logging.getLogger(__name__).debug("Failed to answer callback_query", exc_info=True)
+                _log.debug("Failed to answer callback_query", exc_info=True)
             return
 
         hidden_now = _is_hidden_quiz(quiz)
@@ -129,49 +175,43 @@ def _handle_callback_query(
                 text=f"hidden: {str(hidden_now).lower()}",
             )
         except Exception:
-            logging.getLogger(__name__).debug("Failed to answer callback_query", exc_info=True)
+            _log.debug("Failed to answer callback_query", exc_info=True)
 
         msg = callback_query.get("message") or {}
         if isinstance(msg, dict):
             cb_chat_id = int((msg.get("chat") or {}).get("id") or 0)
             cb_message_id = int(msg.get("message_id") or 0)
-            qid = str(quiz.get("id") or "").strip()
-            question = str(quiz.get("question") or "").strip()
-            answer = str(quiz.get("answer") or "").strip()
-            processed = bool(quiz.get("processed"))
-            new_text = (
-                f"Квиз: {qid}\n"
-                f"processed: {str(processed).lower()}\n"
-                f"hidden: {str(hidden_now).lower()}\n"
-                f"Вопрос: {question}\n"
-                f"Ответ: {answer}"
-            )
 
-            toggle_text = "Показать (hidden=false)" if hidden_now else "Скрыть (hidden=true)"
-            buttons: list[list[Dict[str, str]]] = [
-                [{"text": toggle_text, "callback_data": f"quiz_toggle_hidden:{qid}"}],
-                [{"text": "Редактировать", "callback_data": f"quiz_edit:{qid}"}],
-            ]
-            if not hidden_now:
-                buttons.append([{"text": "Отправить администраторам", "callback_data": f"quiz_send_admins:{qid}"}])
+            # Rebuild the whole /quiz_list page this button lives on; the
+            # page's quiz set comes from its own keyboard.
+            page_qids = _page_quiz_ids(msg) or [quiz_id]
+            index = _quiz_index(quizzes)
+            cards: list[str] = []
+            rows: list[list[Dict[str, str]]] = []
+            for qid in page_qids:
+                q = index.get(qid)
+                if q is None:
+                    continue
+                cards.append(_quiz_card_text(q))
+                rows.append(_quiz_buttons_row(q))
 
             try:
                 tg.edit_message_text(
                     chat_id=cb_chat_id,
                     message_id=cb_message_id,
-                    text=new_text,
+                    text="\n\n".join(cards),
                     parse_mode=None,
                 )
             except Exception:
-                logging.getLogger(__name__).debug("Failed to edit message text", exc_info=True)
+                _log.debug("Failed to edit message text", exc_info=True)
             try:
                 tg.edit_message_reply_markup(
                     chat_id=cb_chat_id,
                     message_id=cb_message_id,
-                    reply_markup={"inline_keyboard": buttons},
+                    reply_markup={"inline_keyboard": rows},
                 )
             except Exception:
-                logging.getLogger(__name__).debug("Failed to edit reply markup", exc_info=True)
+                _log.debug("Failed to edit reply markup", exc_info=True)
         return
 
     if _is_hidden_quiz(quiz):
@@ -182,22 +222,22 @@ def _handle_callback_query(
                 show_alert=True,
             )
         except Exception:
-            logging.getLogger(__name__).debug("Failed to answer callback_query", exc_info=True)
+            _log.debug("Failed to answer callback_query", exc_info=True)
         return
 
     if action == "send_all" and bool(quiz.get("processed")):
         try:
             tg.answer_callback_query(callback_query_id=callback_query_id, text="Квиз уже помечен как processed.")
         except Exception:
-            logging.getLogger(__name__).debug("Failed to answer callback_query", exc_info=True)
+            _log.debug("Failed to answer callback_query", exc_info=True)
         return
 
     try:
         tg.answer_callback_query(callback_query_id=callback_query_id, text="Начинаю отправку...")
     except Exception:
-        logging.getLogger(__name__).debug("Failed to answer callback_query", exc_info=True)
+        _log.debug("Failed to answer callback_query", exc_info=True)
 
-    question = str(quiz.get("question") or "").strip()
+    question = _sid(quiz, "question")
     sent_ok = 0
     sent_fail = 0
     total_targets = 0
@@ -236,7 +276,7 @@ def _handle_callback_query(
         try:
             _save_quiz_state(quiz_state_file, state)
         except Exception:
-            logging.getLogger(__name__).warning("Failed to save quiz state file %s", quiz_state_file, exc_info=True)
+            _log.warning("Failed to save quiz state file %s", quiz_state_file, exc_info=True)
     else:
         course_chat_id = settings.get("course_chat_id")
         if not isinstance(course_chat_id, int) or course_chat_id == 0:
@@ -247,38 +287,15 @@ def _handle_callback_query(
                     show_alert=True,
                 )
             except Exception:
-                logging.getLogger(__name__).debug("Failed to answer callback_query", exc_info=True)
+                _log.debug("Failed to answer callback_query", exc_info=True)
             return
 
-        from pathlib import Path as _Path
-        path = _Path(pm_log_file)
-        users: set[int] = set()
-        if path.exists():
-            try:
-                with path.open("r", encoding="utf-8") as f:
-                    for line in f:
-                        line = line.strip()
-                        if not line:
-                            continue
-                        try:
-                            rec = json.loads(line)
-                            uid = int((rec or {}).get("user_id") or 0)
-                            if uid > 0:
-                                users.add(uid)
-                        except Exception:
-                            continue
-            except Exception:
-                logging.getLogger(__name__).warning("Failed to read pm log file %s", pm_log_file, exc_info=True)
-
-        in_course_users: list[int] = []
-        for uid in sorted(users):
-            try:
-                member = tg.get_chat_member(chat_id=course_chat_id, user_id=uid)
-                status = str((member.get("result") or {}).get("status") or "")
-                if status in {"creator", "administrator", "member", "restricted"}:
-                    in_course_users.append(uid)
-            except Exception:
-                continue
+        users = _pm_user_ids(pm_log_file)
+        in_course_users, _ = _filter_course_members(
+            tg=tg,
+            chat_id=course_chat_id,
+            user_ids=users,
+        )
 
         total_targets = len(in_course_users)
         state = _load_quiz_state(quiz_state_file)
@@ -304,20 +321,20 @@ def _handle_callback_query(
         try:
             _save_quizzes(quizzes_file=quizzes_file, quizzes=quizzes)
         except Exception:
-            logging.getLogger(__name__).warning("Failed to save quizzes file %s", quizzes_file, exc_info=True)
+            _log.warning("Failed to save quizzes file %s", quizzes_file, exc_info=True)
         for uid in sent_users:
             u = _get_user_quiz_state(state, uid)
             u["active_quiz_id"] = str(quiz_id)
         try:
             _save_quiz_state(quiz_state_file, state)
         except Exception:
-            logging.getLogger(__name__).warning("Failed to save quiz state file %s", quiz_state_file, exc_info=True)
+            _log.warning("Failed to save quiz state file %s", quiz_state_file, exc_info=True)
 
     msg = callback_query.get("message") or {}
     if isinstance(msg, dict):
         cb_chat_id = int((msg.get("chat") or {}).get("id") or 0)
         cb_message_id = int(msg.get("message_id") or 0)
-        prev_text = str(msg.get("text") or "").strip()
+        prev_text = _sid(msg, "text")
         status_line = ""
         if action == "send_admins":
             status_line = f"Отправлено администраторам: {sent_ok}/{total_targets}\nОшибок: {sent_fail}"
@@ -331,7 +348,7 @@ def _handle_callback_query(
         try:
             tg.edit_message_text(chat_id=cb_chat_id, message_id=cb_message_id, text=new_text, parse_mode=None)
         except Exception:
-            logging.getLogger(__name__).debug("Failed to edit message text", exc_info=True)
+            _log.debug("Failed to edit message text", exc_info=True)
         if action == "send_all":
             try:
                 tg.edit_message_reply_markup(
@@ -340,4 +357,4 @@ def _handle_callback_query(
                     reply_markup={"inline_keyboard": []},
                 )
             except Exception:
-                logging.getLogger(__name__).debug("Failed to edit reply markup", exc_info=True)
+                _log.debug("Failed to edit reply markup", exc_info=True)
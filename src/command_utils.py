@@ -1,3 +1,4 @@
+import functools
 import os
 from typing import Any, Dict, Tuple
 
@@ -42,8 +43,15 @@ def _get_sender(message: Dict[str, Any]) -> Tuple[int, str]:
 
 
 def _is_admin(settings: Dict[str, Any], user_id: int, username: str) -> bool:
-    admins = settings.get("admin_users") or []
     username_norm = username.lstrip("@").lower()
+    admin_ids = settings.get("_admin_ids")
+    if admin_ids is not None:
+        if user_id in admin_ids:
+            return True
+        return bool(username_norm) and username_norm in (settings.get("_admin_usernames") or frozenset())
+    # Settings dicts without precomputed sets (hand-built in tests or legacy
+    # callers) fall back to the linear scan.
+    admins = settings.get("admin_users") or []
     for entry in admins:
         if isinstance(entry, int) and entry == user_id:
             return True
@@ -52,6 +60,17 @@ def _is_admin(settings: Dict[str, Any], user_id: int, username: str) -> bool:
     return False
 
 
+@functools.lru_cache(maxsize=512)
+def _first_token_targets_bot(first: str, bot_username: str) -> bool:
+    if "@" not in first:
+        return True
+    if not bot_username:
+        return False
+    _, mentioned = first.split("@", maxsplit=1)
+    mentioned = mentioned.strip().lstrip("@").lower()
+    return mentioned == bot_username.strip().lstrip("@").lower()
+
+
 def _is_command_for_this_bot(text: str, bot_username: str) -> bool:
     """
     True if `text` looks like a bot command that is intended for THIS bot.
@@ -59,15 +78,13 @@ def _is_command_for_this_bot(text: str, bot_username: str) -> bool:
     - /cmd ...              -> True
     - /cmd@ThisBot ...      -> True (case-insensitive)
     - /cmd@OtherBot ...     -> False
+
+    The distinct first tokens (/help, /qa, /quiz, ...) form a tiny set and
+    bot_username is constant for the process, so the split/lower work is
+    memoized per token.
     """
     text = (text or "").strip()
     if not text.startswith("/"):
         return False
     first = text.split(maxsplit=1)[0]
-    if "@" not in first:
-        return True
-    if not bot_username:
-        return False
-    _, mentioned = first.split("@", maxsplit=1)
-    mentioned = mentioned.strip().lstrip("@").lower()
-    return mentioned == bot_username.strip().lstrip("@").lower()
+    return _first_token_targets_bot(first, bot_username)
@@ -1,9 +1,19 @@
 import argparse
-import json
 import logging
+import os
+import threading
 from pathlib import Path
 from typing import Any, Dict
 
+from json_utils import _json_dumps_pretty, _json_loads, _safe_write_bytes
+
+_log = logging.getLogger(__name__)
+
+# Parsed settings keyed by config path, tagged with the file's mtime_ns so
+# external edits are still picked up on the next message.
+_SETTINGS_CACHE: dict[str, tuple[int, Dict[str, Any]]] = {}
+_SETTINGS_CACHE_LOCK = threading.Lock()
+
 
 def _parse_args(argv: list[str] | None = None) -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="Fintech DL HSE assistant Telegram bot")
@@ -51,7 +61,9 @@ def _load_settings(config_path: str) -> Dict[str, Any]:
       - drive_credentials_path: str|null (путь к JSON ключу service account для Drive)
       - drive_feedback_folder_id: str|null (ID папки Drive с шаблоном формы обратной связи)
 
-    The file is intentionally read on every request.
+    The file is intentionally re-checked on every request; the parsed result
+    is cached by mtime so an unchanged file costs one stat() instead of a
+    read + parse + normalization pass per update.
     """
     fallback: Dict[str, Any] = {
         "admin_users": [],
@@ -59,21 +71,45 @@ def _load_settings(config_path: str) -> Dict[str, Any]:
         "backup_chat_id": None,
         "drive_credentials_path": None,
         "drive_feedback_folder_id": None,
+        "_admin_ids": frozenset(),
+        "_admin_usernames": frozenset(),
     }
     try:
+        try:
+            mtime_ns = os.stat(config_path).st_mtime_ns
+        except OSError:
+            mtime_ns = None
+        if mtime_ns is not None:
+            with _SETTINGS_CACHE_LOCK:
+                cached = _SETTINGS_CACHE.get(config_path)
+            if cached is not None and cached[0] == mtime_ns:
+                settings = dict(cached[1])
+                settings["admin_users"] = list(settings["admin_users"])
+                return settings
         path = Path(config_path)
         if not path.exists():
             example_path = Path(__file__).with_name("bot_config_example.json")
             if example_path.exists():
                 path.parent.mkdir(parents=True, exist_ok=True)
                 path.write_text(example_path.read_text(encoding="utf-8"), encoding="utf-8")
-        raw = path.read_text(encoding="utf-8")
-        data = json.loads(raw)
+        raw = path.read_bytes()
+        data = _json_loads(raw)
         if not isinstance(data, dict):
             return fallback
         admin_users = data.get("admin_users", [])
         if not isinstance(admin_users, list):
             admin_users = []
+        admin_ids: set[int] = set()
+        admin_usernames: set[str] = set()
+        for entry in admin_users:
+            if isinstance(entry, int):
+                admin_ids.add(entry)
+            elif isinstance(entry, str):
+                stripped = entry.strip()
+                if stripped.lstrip("-").isdigit():
+                    admin_ids.add(int(stripped))
+                elif stripped:
+                    admin_usernames.add(stripped.lstrip("@").lower())
         course_chat_id_raw = data.get("course_chat_id", None)
         course_chat_id: int | None
         if isinstance(course_chat_id_raw, int):
@@ -106,15 +142,29 @@ def _load_settings(config_path: str) -> Dict[str, Any]:
             drive_feedback_folder_id = None
         else:
             drive_feedback_folder_id = drive_feedback_folder_id.strip()
-        return {
+        settings = {
             "admin_users": admin_users,
             "course_chat_id": course_chat_id,
             "backup_chat_id": backup_chat_id,
             "drive_credentials_path": drive_credentials_path,
             "drive_feedback_folder_id": drive_feedback_folder_id,
+            # Precomputed lookup sets for _is_admin; underscore keys are not
+            # persisted by _save_settings.
+            "_admin_ids": frozenset(admin_ids),
+            "_admin_usernames": frozenset(admin_usernames),
         }
+        if mtime_ns is None:
+            try:
+                mtime_ns = os.stat(config_path).st_mtime_ns
+            except OSError:
+                mtime_ns = None
+        if mtime_ns is not None:
+            with _SETTINGS_CACHE_LOCK:
+                _SETTINGS_CACHE[config_path] = (mtime_ns, dict(settings))
+        settings["admin_users"] = list(settings["admin_users"])
+        return settings
     except Exception:
-        logging.getLogger(__name__).warning(
+        _log.warning(
             "Failed to load config %s; using defaults",
             config_path,
             exc_info=True,
@@ -130,7 +180,6 @@ def _save_settings(config_path: str, settings: Dict[str, Any]) -> None:
     """
     path = Path(config_path)
     path.parent.mkdir(parents=True, exist_ok=True)
-    tmp_path = path.with_suffix(path.suffix + ".tmp")
     payload = {
         "admin_users": settings.get("admin_users") or [],
         "course_chat_id": settings.get("course_chat_id", None),
@@ -138,6 +187,6 @@ def _save_settings(config_path: str, settings: Dict[str, Any]) -> None:
         "drive_credentials_path": settings.get("drive_credentials_path"),
         "drive_feedback_folder_id": settings.get("drive_feedback_folder_id"),
     }
-    raw = json.dumps(payload, ensure_ascii=False, indent=2) + "\n"
-    tmp_path.write_text(raw, encoding="utf-8")
-    tmp_path.replace(path)
+    _safe_write_bytes(path, _json_dumps_pretty(payload))
+    with _SETTINGS_CACHE_LOCK:
+        _SETTINGS_CACHE.pop(config_path, None)
@@ -1,13 +1,58 @@
-import json
+import atexit
+import copy
 import logging
+import threading
+import time
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Any, Dict
 
+from json_utils import _json_dumps_pretty, _json_loads, _numeric_str_key, _safe_write_bytes
+
+_log = logging.getLogger(__name__)
+
 
 # In-memory wizard state for quiz creation (keyed by admin user_id)
 _QUIZ_WIZARD_STATE: dict[int, Dict[str, Any]] = {}
 
+# Parsed quizzes/quiz-state keyed by path, tagged with (mtime_ns, size) so
+# external edits are picked up on the next load. Callers mutate what they
+# load, so lookups hand out deep copies of the cached object.
+_QUIZ_FILE_CACHE: dict[str, tuple[int, int, Any]] = {}
+_QUIZ_FILE_CACHE_LOCK = threading.Lock()
+
+
+def _file_cache_tag(path: Path) -> tuple[int, int] | None:
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _cached_parsed_file(path: Path, tag: tuple[int, int] | None) -> Any | None:
+    if tag is None:
+        return None
+    with _QUIZ_FILE_CACHE_LOCK:
+        cached = _QUIZ_FILE_CACHE.get(str(path))
+    if cached is not None and (cached[0], cached[1]) == tag:
+        return copy.deepcopy(cached[2])
+    return None
+
+
+def _store_parsed_file(path: Path, tag: tuple[int, int] | None, parsed: Any) -> None:
+    # The tag is taken before the read: if the file is replaced mid-read the
+    # stale tag just forces a re-parse on the next load, never a stale hit.
+    if tag is None:
+        return
+    with _QUIZ_FILE_CACHE_LOCK:
+        _QUIZ_FILE_CACHE[str(path)] = (tag[0], tag[1], copy.deepcopy(parsed))
+
+
+def _invalidate_parsed_file(path: Path) -> None:
+    with _QUIZ_FILE_CACHE_LOCK:
+        _QUIZ_FILE_CACHE.pop(str(path), None)
+
 
 def _quiz_sort_key(q: Dict[str, Any]) -> tuple[int, int | str]:
     qid = q.get("id")
@@ -25,25 +70,23 @@ def _load_quizzes(quizzes_file: str) -> list[Dict[str, Any]]:
     path = Path(quizzes_file)
     if not path.exists():
         return []
+    tag = _file_cache_tag(path)
+    cached = _cached_parsed_file(path, tag)
+    if cached is not None:
+        return cached
     try:
-        raw = path.read_text(encoding="utf-8")
-        data = json.loads(raw)
+        raw = path.read_bytes()
+        data = _json_loads(raw)
         if not isinstance(data, list):
             return []
-        quizzes: list[Dict[str, Any]] = []
-        for item in data:
-            if isinstance(item, dict) and "id" in item:
-                quiz = dict(item)
-                if "processed" not in quiz:
-                    quiz["processed"] = False
-                quiz["processed"] = bool(quiz.get("processed"))
-                if "hidden" not in quiz:
-                    quiz["hidden"] = False
-                quiz["hidden"] = bool(quiz.get("hidden"))
-                quizzes.append(quiz)
+        # No per-quiz dict copies or default injection: every reader goes
+        # through q.get(...)/_is_hidden_quiz, which default to False, and
+        # _save_quizzes normalizes the fields on write.
+        quizzes = [item for item in data if isinstance(item, dict) and "id" in item]
+        _store_parsed_file(path, tag, quizzes)
         return quizzes
     except Exception:
-        logging.getLogger(__name__).warning(
+        _log.warning(
             "Failed to load quizzes file %s; using empty list",
             quizzes_file,
             exc_info=True,
@@ -51,10 +94,27 @@ def _load_quizzes(quizzes_file: str) -> list[Dict[str, Any]]:
         return []
 
 
+def _sid(d: Dict[str, Any], key: str) -> str:
+    """
+    str(d.get(key) or "").strip() with a fast path that returns an already
+    clean string as-is instead of allocating a copy.
+    """
+    v = d.get(key)
+    if type(v) is str:
+        if v and not v[0].isspace() and not v[-1].isspace():
+            return v
+        return v.strip()
+    return "" if not v else str(v).strip()
+
+
+def _quiz_index(quizzes: list[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Map str(quiz id) -> quiz dict for O(1) lookups into a loaded list."""
+    return {str(q.get("id") or ""): q for q in quizzes if isinstance(q, dict)}
+
+
 def _save_quizzes(quizzes_file: str, quizzes: list[Dict[str, Any]]) -> None:
     path = Path(quizzes_file)
     path.parent.mkdir(parents=True, exist_ok=True)
-    tmp_path = path.with_suffix(path.suffix + ".tmp")
     normalized: list[Dict[str, Any]] = []
     for q in list(quizzes):
         if not isinstance(q, dict):
@@ -68,29 +128,110 @@ def _save_quizzes(quizzes_file: str, quizzes: list[Dict[str, Any]]) -> None:
                 "hidden": bool(q.get("hidden")),
             }
         )
-    raw = json.dumps(normalized, ensure_ascii=False, indent=2) + "\n"
-    tmp_path.write_text(raw, encoding="utf-8")
-    tmp_path.replace(path)
+    _safe_write_bytes(path, _json_dumps_pretty(normalized))
+    _invalidate_parsed_file(path)
 
 
 def _is_hidden_quiz(q: Dict[str, Any]) -> bool:
     return bool((q or {}).get("hidden"))
 
+# Write-behind buffer for quiz state: bursts of saves (a broadcast marks
+# dozens of users active back to back) coalesce into at most one full
+# file rewrite per flush interval. Entries stay in the buffer until the
+# write completes so reads never see a stale on-disk version.
+_PENDING_QUIZ_STATE: dict[str, Dict[str, Any]] = {}
+_PENDING_QUIZ_STATE_LOCK = threading.Lock()
+_QUIZ_STATE_FLUSHER: threading.Thread | None = None
+_QUIZ_STATE_FLUSH_DELAY = 1.0
+
+
+def _flush_quiz_state_loop() -> None:
+    global _QUIZ_STATE_FLUSHER
+    while True:
+        time.sleep(_QUIZ_STATE_FLUSH_DELAY)
+        with _PENDING_QUIZ_STATE_LOCK:
+            items = list(_PENDING_QUIZ_STATE.items())
+        for path, state in items:
+            try:
+                _write_quiz_state(path, state)
+            except Exception:
+                _log.warning(
+                    "Failed to flush quiz state file %s",
+                    path,
+                    exc_info=True,
+                )
+            with _PENDING_QUIZ_STATE_LOCK:
+                if _PENDING_QUIZ_STATE.get(path) is state:
+                    del _PENDING_QUIZ_STATE[path]
+        with _PENDING_QUIZ_STATE_LOCK:
+            if not _PENDING_QUIZ_STATE:
+                _QUIZ_STATE_FLUSHER = None
+                return
+
+
+def _drain_pending_quiz_state() -> None:
+    with _PENDING_QUIZ_STATE_LOCK:
+        items = list(_PENDING_QUIZ_STATE.items())
+        _PENDING_QUIZ_STATE.clear()
+    for path, state in items:
+        try:
+            _write_quiz_state(path, state)
+        except Exception:
+            _log.warning(
+                "Failed to flush quiz state file %s on shutdown",
+                path,
+                exc_info=True,
+            )
+
+
+atexit.register(_drain_pending_quiz_state)
+
+
+def _save_quiz_state(quiz_state_file: str, state: Dict[str, Any]) -> None:
+    """
+    Queue `state` for write-behind persistence.
+
+    The flusher thread writes the newest queued snapshot within about a
+    second; _load_quiz_state serves queued state first, so callers keep
+    read-after-write consistency.
+    """
+    global _QUIZ_STATE_FLUSHER
+    with _PENDING_QUIZ_STATE_LOCK:
+        _PENDING_QUIZ_STATE[quiz_state_file] = copy.deepcopy(state)
+        if _QUIZ_STATE_FLUSHER is None:
+            _QUIZ_STATE_FLUSHER = threading.Thread(
+                target=_flush_quiz_state_loop,
+                daemon=True,
+                name="quiz-state-flush",
+            )
+            _QUIZ_STATE_FLUSHER.start()
+
+
 def _load_quiz_state(quiz_state_file: str) -> Dict[str, Any]:
+    with _PENDING_QUIZ_STATE_LOCK:
+        pending = _PENDING_QUIZ_STATE.get(quiz_state_file)
+        if pending is not None:
+            return copy.deepcopy(pending)
     path = Path(quiz_state_file)
     if not path.exists():
         return {"users": {}}
+    tag = _file_cache_tag(path)
+    cached = _cached_parsed_file(path, tag)
+    if cached is not None:
+        return cached
     try:
-        raw = path.read_text(encoding="utf-8")
-        data = json.loads(raw)
+        raw = path.read_bytes()
+        data = _json_loads(raw)
         if not isinstance(data, dict):
             return {"users": {}}
         users = data.get("users")
         if not isinstance(users, dict):
             users = {}
-        return {"users": users}
+        state = {"users": users}
+        _store_parsed_file(path, tag, state)
+        return state
     except Exception:
-        logging.getLogger(__name__).warning(
+        _log.warning(
             "Failed to load quiz state file %s; using empty state",
             quiz_state_file,
             exc_info=True,
@@ -98,23 +239,16 @@ def _load_quiz_state(quiz_state_file: str) -> Dict[str, Any]:
         return {"users": {}}
 
 
-def _save_quiz_state(quiz_state_file: str, state: Dict[str, Any]) -> None:
+def _write_quiz_state(quiz_state_file: str, state: Dict[str, Any]) -> None:
     path = Path(quiz_state_file)
     path.parent.mkdir(parents=True, exist_ok=True)
-    tmp_path = path.with_suffix(path.suffix + ".tmp")
 
     users = state.get("users")
     if not isinstance(users, dict):
         users = {}
 
-    def _user_key_sort(k: str) -> tuple[int, int | str]:
-        s = str(k)
-        if s.lstrip("-").isdigit():
-            return (0, int(s))
-        return (1, s)
-
     normalized_users: Dict[str, Any] = {}
-    for user_key in sorted(users.keys(), key=_user_key_sort):
+    for user_key in sorted(users.keys(), key=_numeric_str_key):
         u = users.get(user_key)
         if not isinstance(u, dict):
             continue
@@ -126,7 +260,7 @@ def _save_quiz_state(quiz_state_file: str, state: Dict[str, Any]) -> None:
         if not isinstance(results, dict):
             results = {}
         norm_results: Dict[str, Any] = {}
-        for qid in sorted(results.keys(), key=_user_key_sort):
+        for qid in sorted(results.keys(), key=_numeric_str_key):
             r = results.get(qid)
             if not isinstance(r, dict):
                 continue
@@ -139,7 +273,7 @@ def _save_quiz_state(quiz_state_file: str, state: Dict[str, Any]) -> None:
         if not isinstance(answers, dict):
             answers = {}
         norm_answers: Dict[str, Any] = {}
-        for qid in sorted(answers.keys(), key=_user_key_sort):
+        for qid in sorted(answers.keys(), key=_numeric_str_key):
             arr = answers.get(qid)
             if not isinstance(arr, list):
                 continue
@@ -160,9 +294,8 @@ def _save_quiz_state(quiz_state_file: str, state: Dict[str, Any]) -> None:
         }
 
     payload = {"users": normalized_users}
-    raw = json.dumps(payload, ensure_ascii=False, indent=2) + "\n"
-    tmp_path.write_text(raw, encoding="utf-8")
-    tmp_path.replace(path)
+    _safe_write_bytes(path, _json_dumps_pretty(payload))
+    _invalidate_parsed_file(path)
 
 
 def _get_user_quiz_state(state: Dict[str, Any], user_id: int) -> Dict[str, Any]:
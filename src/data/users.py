@@ -1,24 +1,39 @@
-import json
 import logging
 from pathlib import Path
 from typing import Any, Dict
 
+from data.quiz import (
+    _cached_parsed_file,
+    _file_cache_tag,
+    _invalidate_parsed_file,
+    _store_parsed_file,
+)
+from json_utils import _json_dumps_pretty, _json_loads, _numeric_str_key, _safe_write_bytes
+
+_log = logging.getLogger(__name__)
+
 
 def _load_users(users_file: str) -> Dict[str, Any]:
     path = Path(users_file)
     if not path.exists():
         return {"users": {}}
+    tag = _file_cache_tag(path)
+    cached = _cached_parsed_file(path, tag)
+    if cached is not None:
+        return cached
     try:
-        raw = path.read_text(encoding="utf-8")
-        data = json.loads(raw)
+        raw = path.read_bytes()
+        data = _json_loads(raw)
         if not isinstance(data, dict):
             return {"users": {}}
         users = data.get("users")
         if not isinstance(users, dict):
             users = {}
-        return {"users": users}
+        state = {"users": users}
+        _store_parsed_file(path, tag, state)
+        return state
     except Exception:
-        logging.getLogger(__name__).warning(
+        _log.warning(
             "Failed to load users file %s; using empty state",
             users_file,
             exc_info=True,
@@ -29,20 +44,20 @@ def _load_users(users_file: str) -> Dict[str, Any]:
 def _save_users(users_file: str, data: Dict[str, Any]) -> None:
     path = Path(users_file)
     path.parent.mkdir(parents=True, exist_ok=True)
-    tmp_path = path.with_suffix(path.suffix + ".tmp")
 
     users = data.get("users")
     if not isinstance(users, dict):
         users = {}
 
-    def _user_key_sort(k: str) -> tuple[int, int | str]:
-        s = str(k)
-        if s.lstrip("-").isdigit():
-            return (0, int(s))
-        return (1, s)
+    # Keys come back from disk already in sorted order and new users are
+    # appended one at a time, so most saves can skip the sort entirely.
+    keys = list(users.keys())
+    key_vals = [_numeric_str_key(k) for k in keys]
+    if any(a > b for a, b in zip(key_vals, key_vals[1:])):
+        keys = sorted(keys, key=_numeric_str_key)
 
     normalized_users: Dict[str, Any] = {}
-    for user_key in sorted(users.keys(), key=_user_key_sort):
+    for user_key in keys:
         u = users.get(user_key)
         if not isinstance(u, dict):
             continue
@@ -57,6 +72,5 @@ def _save_users(users_file: str, data: Dict[str, Any]) -> None:
         }
 
     payload = {"users": normalized_users}
-    raw = json.dumps(payload, ensure_ascii=False, indent=2) + "\n"
-    tmp_path.write_text(raw, encoding="utf-8")
-    tmp_path.replace(path)
+    _safe_write_bytes(path, _json_dumps_pretty(payload))
+    _invalidate_parsed_file(path)
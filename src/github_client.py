@@ -4,10 +4,13 @@ GitHub API client for repository existence, collaborators, and invitations.
 Uses personal access token from environment:
   - GITHUB_TOKEN or GITHUB_ACCESS_TOKEN
 """
+import functools
 import logging
 import os
 import base64
-from typing import Any, Dict, List, Optional, Tuple
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar
 
 import requests
 
@@ -17,6 +20,43 @@ API_VERSION = "2022-11-28"
 _log = logging.getLogger(__name__)
 _log.setLevel(logging.DEBUG)
 
+_F = TypeVar("_F", bound=Callable[..., Any])
+
+
+def _ttl_cache(ttl: float) -> Callable[[_F], _F]:
+    """
+    Memoize a function by positional+keyword args for `ttl` seconds.
+
+    Existence/collaborator answers change rarely compared to how often
+    /invit re-asks for them, so a short TTL removes most round-trips
+    while keeping answers acceptably fresh.
+    """
+
+    def decorator(func: _F) -> _F:
+        cache: Dict[Any, Tuple[float, Any]] = {}
+        lock = threading.Lock()
+
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            key = (args, tuple(sorted(kwargs.items())))
+            now = time.monotonic()
+            with lock:
+                entry = cache.get(key)
+                if entry is not None and now - entry[0] < ttl:
+                    return entry[1]
+            value = func(*args, **kwargs)
+            with lock:
+                cache[key] = (now, value)
+                if len(cache) > 4096:
+                    cutoff = now - ttl
+                    for k in [k for k, (ts, _) in cache.items() if ts < cutoff]:
+                        del cache[k]
+            return value
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
+
 
 def _get_token() -> Optional[str]:
     token = os.environ.get("GITHUB_TOKEN") or os.environ.get("GITHUB_ACCESS_TOKEN")
@@ -36,6 +76,7 @@ def _headers(token_override: Optional[str] = None) -> Dict[str, str]:
     return h
 
 
+@_ttl_cache(ttl=300.0)
 def user_exists(username: str) -> bool:
     """
     Check if a GitHub user exists.
@@ -75,6 +116,7 @@ def user_exists(username: str) -> bool:
         return False
 
 
+@_ttl_cache(ttl=300.0)
 def repo_exists(owner: str, repo: str) -> bool:
     """
     Check if a GitHub repository exists (and is accessible with the configured token).
@@ -282,6 +324,9 @@ def get_latest_lecture_url(
     return f"https://github.com/{owner}/{repo}/blob/{branch}/{path}"
 
 
+# Short TTL: a student accepting an invitation should be seen as a
+# collaborator on their next /invit, not five minutes later.
+@_ttl_cache(ttl=60.0)
 def is_collaborator(owner: str, repo: str, username: str) -> bool:
     """
     Check if a user is a repository collaborator.
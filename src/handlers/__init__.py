@@ -30,6 +30,8 @@ from handlers.quiz import (
 from handlers.teach import handle_teach
 from handlers.user import handle_github, handle_me
 
+_log = logging.getLogger(__name__)
+
 COMMAND_HANDLERS: dict[str, Callable[[BotContext], None]] = {
     "/help": handle_help,
     "/get_chat_id": handle_get_chat_id,
@@ -76,6 +78,6 @@ def dispatch(ctx: BotContext) -> None:
     try:
         ctx.tg.send_message_reaction(chat_id=ctx.chat_id, message_id=ctx.message_id, reaction_emoji="👀")
     except Exception:
-        logging.getLogger(__name__).debug("Failed to set reaction", exc_info=True)
+        _log.debug("Failed to set reaction", exc_info=True)
 
     handler(ctx)
@@ -1,14 +1,26 @@
-import json
-import logging
+import re
+import time
 from pathlib import Path
-from typing import Any, Dict
 
 from context import BotContext
 from config import _save_settings
 from backup import _create_backup
-from logging_utils import _tokens_stat_from_log
+from json_utils import _json_loads
+from logging_utils import _flush_appender, _tokens_stat_from_log
+from membership import _ADMIN_STATUSES, _BACKUP_STATUSES, _filter_course_members, _status_of
 from text_format import _send_with_formatting_fallback
 
+# Every log record serializes user_id as a plain integer, so a byte-level
+# regex pulls it out without building a dict per line; malformed lines
+# fall back to the JSON parser.
+_USER_ID_RE = re.compile(rb'"user_id"\s*:\s*(-?\d+)')
+
+# Ready /course_members reports keyed by (log mtime_ns, log size, chat id):
+# if neither the log nor the target chat changed, a repeat run within the
+# TTL skips the log scan and every membership round-trip.
+_COURSE_STATS_CACHE: dict[tuple[int, int, int], tuple[str, float]] = {}
+_COURSE_STATS_TTL = 60.0
+
 
 def handle_tokens_stat(ctx: BotContext) -> None:
     if not ctx.is_admin:
@@ -81,14 +93,16 @@ def handle_add_admin(ctx: BotContext) -> None:
     if not isinstance(admin_users, list):
         admin_users = []
 
-    already = False
-    for entry in admin_users:
-        if isinstance(entry, int) and entry == new_admin_id:
-            already = True
-            break
-        if isinstance(entry, str) and entry.strip().isdigit() and int(entry.strip()) == new_admin_id:
-            already = True
-            break
+    admin_ids = ctx.settings.get("_admin_ids")
+    if isinstance(admin_ids, frozenset):
+        already = new_admin_id in admin_ids
+    else:
+        # Settings that bypassed _load_settings lack the precomputed set.
+        already = any(
+            (isinstance(entry, int) and entry == new_admin_id)
+            or (isinstance(entry, str) and entry.strip().isdigit() and int(entry.strip()) == new_admin_id)
+            for entry in admin_users
+        )
 
     if already:
         _send_with_formatting_fallback(
@@ -161,8 +175,7 @@ def handle_course_chat(ctx: BotContext) -> None:
         return
 
     try:
-        member = ctx.tg.get_chat_member(chat_id=course_chat_id, user_id=ctx.bot_user_id)
-        status = str((member.get("result") or {}).get("status") or "")
+        status = _status_of(ctx.tg.get_chat_member(chat_id=course_chat_id, user_id=ctx.bot_user_id))
     except Exception as e:
         _send_with_formatting_fallback(
             tg=ctx.tg,
@@ -172,7 +185,7 @@ def handle_course_chat(ctx: BotContext) -> None:
         )
         return
 
-    if status not in {"administrator", "creator"}:
+    if status not in _ADMIN_STATUSES:
         _send_with_formatting_fallback(
             tg=ctx.tg,
             chat_id=ctx.chat_id,
@@ -245,8 +258,7 @@ def handle_set_backup_chat_id(ctx: BotContext) -> None:
         return
 
     try:
-        member = ctx.tg.get_chat_member(chat_id=backup_chat_id, user_id=ctx.bot_user_id)
-        status = str((member.get("result") or {}).get("status") or "")
+        status = _status_of(ctx.tg.get_chat_member(chat_id=backup_chat_id, user_id=ctx.bot_user_id))
     except Exception as e:
         _send_with_formatting_fallback(
             tg=ctx.tg,
@@ -256,7 +268,7 @@ def handle_set_backup_chat_id(ctx: BotContext) -> None:
         )
         return
 
-    if status not in {"administrator", "creator", "member"}:
+    if status not in _BACKUP_STATUSES:
         _send_with_formatting_fallback(
             tg=ctx.tg,
             chat_id=ctx.chat_id,
@@ -361,6 +373,7 @@ def handle_course_members(ctx: BotContext) -> None:
         )
         return
 
+    _flush_appender(ctx.pm_log_file)
     path = Path(ctx.pm_log_file)
     if not path.exists():
         _send_with_formatting_fallback(
@@ -371,23 +384,48 @@ def handle_course_members(ctx: BotContext) -> None:
         )
         return
 
+    try:
+        st = path.stat()
+        cache_key = (st.st_mtime_ns, st.st_size, course_chat_id)
+    except OSError:
+        cache_key = None
+    if cache_key is not None:
+        cached = _COURSE_STATS_CACHE.get(cache_key)
+        if cached is not None and time.monotonic() - cached[1] < _COURSE_STATS_TTL:
+            _send_with_formatting_fallback(
+                tg=ctx.tg,
+                chat_id=ctx.chat_id,
+                message_thread_id=ctx.message_thread_id,
+                text=cached[0],
+            )
+            return
+
     users: set[int] = set()
     total_lines = 0
     bad_lines = 0
     try:
-        with path.open("r", encoding="utf-8") as f:
-            for line in f:
-                total_lines += 1
-                line = line.strip()
-                if not line:
-                    continue
-                try:
-                    rec = json.loads(line)
-                    uid = int((rec or {}).get("user_id") or 0)
-                    if uid > 0:
-                        users.add(uid)
-                except Exception:
-                    bad_lines += 1
+        # One read + C-level splitlines instead of a Python-level iteration
+        # per line; bytes feed the regex and the JSON parser directly (orjson
+        # accepts them), so no per-line utf-8 decode either.
+        lines = path.read_bytes().splitlines()
+        total_lines = len(lines)
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+            m = _USER_ID_RE.search(line)
+            if m:
+                uid = int(m.group(1))
+                if uid > 0:
+                    users.add(uid)
+                continue
+            try:
+                rec = _json_loads(line)
+                uid = int((rec or {}).get("user_id") or 0)
+                if uid > 0:
+                    users.add(uid)
+            except Exception:
+                bad_lines += 1
     except Exception as e:
         _send_with_formatting_fallback(
             tg=ctx.tg,
@@ -397,30 +435,31 @@ def handle_course_members(ctx: BotContext) -> None:
         )
         return
 
-    in_course_users: set[int] = set()
-    checked = 0
-    check_errors = 0
-    for uid in users:
-        checked += 1
-        try:
-            member = ctx.tg.get_chat_member(chat_id=course_chat_id, user_id=uid)
-            status = str((member.get("result") or {}).get("status") or "")
-            if status in {"creator", "administrator", "member", "restricted"}:
-                in_course_users.add(uid)
-        except Exception:
-            check_errors += 1
+    in_course_users, check_errors = _filter_course_members(
+        tg=ctx.tg,
+        chat_id=course_chat_id,
+        user_ids=users,
+    )
+    checked = len(users)
+
+    text = (
+        "Статистика по личным сообщениям:\n"
+        f"- пользователей (всего в логе): {len(users)}\n"
+        f"- пользователей (в чате курса): {len(in_course_users)}\n"
+        f"- строк в логе: {total_lines}\n"
+        f"- битых строк: {bad_lines}\n"
+        f"- проверено membership: {checked}\n"
+        f"- ошибок проверки membership: {check_errors}"
+    )
+    if cache_key is not None:
+        now = time.monotonic()
+        for key in [k for k, (_, ts) in _COURSE_STATS_CACHE.items() if now - ts >= _COURSE_STATS_TTL]:
+            del _COURSE_STATS_CACHE[key]
+        _COURSE_STATS_CACHE[cache_key] = (text, now)
 
     _send_with_formatting_fallback(
         tg=ctx.tg,
         chat_id=ctx.chat_id,
         message_thread_id=ctx.message_thread_id,
-        text=(
-            "Статистика по личным сообщениям:\n"
-            f"- пользователей (всего в логе): {len(users)}\n"
-            f"- пользователей (в чате курса): {len(in_course_users)}\n"
-            f"- строк в логе: {total_lines}\n"
-            f"- битых строк: {bad_lines}\n"
-            f"- проверено membership: {checked}\n"
-            f"- ошибок проверки membership: {check_errors}"
-        ),
+        text=text,
     )
@@ -1,4 +1,5 @@
 import json
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any, Dict
 
 from context import BotContext
@@ -22,6 +23,83 @@ from github_client import (
 )
 
 
+# Bounded pool for per-homework GitHub round-trips in /invit: each entry
+# needs 2-4 independent HTTPS calls, so running entries concurrently turns
+# the command latency from a sum of RTTs into roughly the slowest entry.
+_GH_POOL = ThreadPoolExecutor(max_workers=8, thread_name_prefix="gh-invit")
+
+
+def _invit_row(entry: Any, github_nick: str) -> Dict[str, Any] | None:
+    """Build one /invit table row for a hw-meta entry (None to skip it)."""
+    if not isinstance(entry, dict):
+        return None
+    hw_id = str(entry.get("id") or "").strip()
+    if not hw_id:
+        return None
+    stored_invite_link = (entry.get("classroom_invite_link") or "").strip() or None
+    if not stored_invite_link:
+        return None
+
+    repo_template = (entry.get("repo_name_template") or "").strip() or (hw_id + "-{github_nickname}")
+    full_name = repo_template.replace("{github_nickname}", github_nick)
+    if "/" not in full_name:
+        full_name = "fintech-dl-hse/" + full_name
+
+    owner, repo = full_name.split("/", 1)
+    owner = owner.strip()
+    repo = repo.strip()
+    if not owner or not repo:
+        return None
+
+    repo_url = f"https://github.com/{owner}/{repo}"
+    exists = github_repo_exists(owner=owner, repo=repo)
+    is_collab = github_is_collaborator(owner=owner, repo=repo, username=github_nick)
+
+    link_url = repo_url
+    if exists and is_collab:
+        link_url = repo_url
+    else:
+        inv_link: str | None = None
+        if not exists:
+            inv_link = stored_invite_link
+        else:
+            invitations = github_list_repo_invitations(owner=owner, repo=repo)
+            nick_lower = github_nick.lower()
+            invite_for_user = next(
+                (
+                    inv
+                    for inv in invitations
+                    if (inv.get("invitee") or {}).get("login", "").lower() == nick_lower
+                ),
+                None,
+            )
+            if invite_for_user:
+                inv_link = (
+                    stored_invite_link
+                    or invite_for_user.get("html_url")
+                    or f"https://github.com/{owner}/{repo}/invitations"
+                )
+            else:
+                if github_add_collaborator(owner=owner, repo=repo, username=github_nick):
+                    inv_link = f"https://github.com/{owner}/{repo}/invitations"
+                else:
+                    return None
+        if inv_link:
+            link_url = inv_link
+
+    deadline_iso = str(entry.get("deadline") or "").strip()
+    max_points = int(entry.get("max_points") or 0)
+    is_bonus = bool(entry.get("bonus", False))
+    return {
+        "hw_id": hw_id,
+        "deadline": deadline_iso,
+        "max_points": max_points,
+        "bonus": is_bonus,
+        "short_name": _hw_id_to_short_name(hw_id),
+        "link_url": link_url,
+    }
+
+
 def handle_invit(ctx: BotContext) -> None:
     users_data = _load_users(ctx.users_file)
     users = users_data.get("users")
@@ -71,74 +149,8 @@ def handle_invit(ctx: BotContext) -> None:
         )
         return
 
-    rows: list[Dict[str, Any]] = []
-    for entry in meta:
-        if not isinstance(entry, dict):
-            continue
-        hw_id = str(entry.get("id") or "").strip()
-        if not hw_id:
-            continue
-        stored_invite_link = (entry.get("classroom_invite_link") or "").strip() or None
-        if not stored_invite_link:
-            continue
-
-        repo_template = (entry.get("repo_name_template") or "").strip() or (hw_id + "-{github_nickname}")
-        full_name = repo_template.replace("{github_nickname}", github_nick)
-        if "/" not in full_name:
-            full_name = "fintech-dl-hse/" + full_name
-
-        owner, repo = full_name.split("/", 1)
-        owner = owner.strip()
-        repo = repo.strip()
-        if not owner or not repo:
-            continue
-
-        repo_url = f"https://github.com/{owner}/{repo}"
-        exists = github_repo_exists(owner=owner, repo=repo)
-        is_collab = github_is_collaborator(owner=owner, repo=repo, username=github_nick)
-
-        link_url = repo_url
-        if exists and is_collab:
-            link_url = repo_url
-        else:
-            inv_link: str | None = None
-            if not exists:
-                inv_link = stored_invite_link
-            else:
-                invitations = github_list_repo_invitations(owner=owner, repo=repo)
-                invite_for_user = next(
-                    (
-                        inv
-                        for inv in invitations
-                        if (inv.get("invitee") or {}).get("login", "").lower() == github_nick.lower()
-                    ),
-                    None,
-                )
-                if invite_for_user:
-                    inv_link = (
-                        stored_invite_link
-                        or invite_for_user.get("html_url")
-                        or f"https://github.com/{owner}/{repo}/invitations"
-                    )
-                else:
-                    if github_add_collaborator(owner=owner, repo=repo, username=github_nick):
-                        inv_link = f"https://github.com/{owner}/{repo}/invitations"
-                    else:
-                        continue
-            if inv_link:
-                link_url = inv_link
-
-        deadline_iso = str(entry.get("deadline") or "").strip()
-        max_points = int(entry.get("max_points") or 0)
-        is_bonus = bool(entry.get("bonus", False))
-        rows.append({
-            "hw_id": hw_id,
-            "deadline": deadline_iso,
-            "max_points": max_points,
-            "bonus": is_bonus,
-            "short_name": _hw_id_to_short_name(hw_id),
-            "link_url": link_url,
-        })
+    row_iter = _GH_POOL.map(lambda entry: _invit_row(entry, github_nick), meta)
+    rows: list[Dict[str, Any]] = [row for row in row_iter if row is not None]
 
     rows.sort(key=lambda r: (r["bonus"], r["deadline"]))
 
@@ -176,13 +188,13 @@ def handle_invit(ctx: BotContext) -> None:
 
         md_parts.append("")
 
-    header = _escape_markdown_v2_plain(f"GitHub: {github_nick}") + "\n\n"
+    header = _escape_markdown_v2_plain(f"GitHub: {github_nick}")
     body = "\n".join(md_parts).rstrip()
     _send_with_formatting_fallback(
         tg=ctx.tg,
         chat_id=ctx.chat_id,
         message_thread_id=ctx.message_thread_id,
-        text=header + body,
+        text=f"{header}\n\n{body}",
         markdown_v2_raw=True,
     )
 
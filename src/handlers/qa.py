@@ -4,9 +4,11 @@ from context import BotContext
 from constants import OPENAI_MODEL
 from data.quiz import _load_quizzes
 from llm import _answer_question, _fetch_readme, _is_quiz_question_paraphrase
-from logging_utils import _log_token_usage
+from logging_utils import _get_user_fields, _log_token_usage
 from text_format import _send_with_formatting_fallback
 
+_log = logging.getLogger(__name__)
+
 
 def handle_qa(ctx: BotContext) -> None:
     if not ctx.args:
@@ -18,6 +20,8 @@ def handle_qa(ctx: BotContext) -> None:
         )
         return
 
+    user_fields = _get_user_fields(ctx.message)
+
     # Extra OpenAI check: if the question is a paraphrase of a quiz question, refuse to answer.
     quizzes = _load_quizzes(ctx.quizzes_file)
     if quizzes:
@@ -28,7 +32,7 @@ def handle_qa(ctx: BotContext) -> None:
                 quiz_questions=quizzes,
             )
         except Exception as e:
-            logging.getLogger(__name__).warning(
+            _log.warning(
                 "Unexpected error in quiz paraphrase check: %s: %s",
                 type(e).__name__,
                 e,
@@ -45,6 +49,7 @@ def handle_qa(ctx: BotContext) -> None:
                 purpose="qa_quiz_paraphrase_check",
                 model=OPENAI_MODEL,
                 usage=usage,
+                user_fields=user_fields,
             )
 
         if is_paraphrase:
@@ -89,6 +94,7 @@ def handle_qa(ctx: BotContext) -> None:
             purpose="qa",
             model=OPENAI_MODEL,
             usage=usage,
+            user_fields=user_fields,
         )
 
     _send_with_formatting_fallback(
@@ -1,5 +1,7 @@
+import functools
 import logging
 import math
+import sys
 from typing import Any, Dict
 
 from context import BotContext
@@ -11,19 +13,63 @@ from data.quiz import (
     _is_hidden_quiz,
     _load_quiz_state,
     _load_quizzes,
+    _quiz_index,
     _save_quiz_state,
     _save_quizzes,
+    _sid,
 )
 from llm import _judge_quiz_answer
 from logging_utils import _log_token_usage
+from membership import _filter_course_members
 from text_format import _send_with_formatting_fallback
 
+_log = logging.getLogger(__name__)
+
+# /quiz_list packs several quiz cards into one message; pages are flushed
+# below this size to stay clear of Telegram's 4096-char limit.
+_QUIZ_LIST_PAGE_CHARS = 3500
+
+
+def _quiz_card_text(q: Dict[str, Any]) -> str:
+    """Plain-text card for one quiz as shown by /quiz_list."""
+    qid = _sid(q, "id")
+    question = _sid(q, "question")
+    answer = _sid(q, "answer")
+    processed = bool(q.get("processed"))
+    hidden = _is_hidden_quiz(q)
+    return (
+        f"Квиз: {qid}\n"
+        f"processed: {str(processed).lower()}\n"
+        f"hidden: {str(hidden).lower()}\n"
+        f"Вопрос: {question}\n"
+        f"Ответ: {answer}"
+    )
+
+
+def _quiz_buttons_row(q: Dict[str, Any]) -> list[Dict[str, str]]:
+    """One inline-keyboard row of actions for a quiz, labelled with its id."""
+    return _quiz_buttons_row_cached(_sid(q, "id"), _is_hidden_quiz(q))
+
+
+@functools.lru_cache(maxsize=512)
+def _quiz_buttons_row_cached(qid: str, hidden: bool) -> list[Dict[str, str]]:
+    # A row depends only on (qid, hidden), so the memo never goes stale;
+    # callers embed the row as-is and must treat it as read-only.
+    toggle_text = f"Показать: {qid}" if hidden else f"Скрыть: {qid}"
+    row = [
+        {"text": toggle_text, "callback_data": f"quiz_toggle_hidden:{qid}"},
+        {"text": f"Редактировать: {qid}", "callback_data": f"quiz_edit:{qid}"},
+    ]
+    if not hidden:
+        row.append({"text": f"Админам: {qid}", "callback_data": f"quiz_send_admins:{qid}"})
+    return row
+
 
 def handle_quiz_wizard(ctx: BotContext) -> None:
     """Handle quiz creation/edit wizard (non-command messages from admin in private)."""
     state = _QUIZ_WIZARD_STATE.get(ctx.user_id) or {}
     stage = str(state.get("stage") or "")
-    quiz_id = str(state.get("quiz_id") or "").strip()
+    quiz_id = _sid(state, "quiz_id")
     mode = str(state.get("mode") or "create")
     text = (ctx.message.get("text") or "").strip()
 
@@ -58,15 +104,12 @@ def handle_quiz_wizard(ctx: BotContext) -> None:
             )
             return
 
-        question = str(state.get("question") or "").strip()
+        question = _sid(state, "question")
 
         quizzes = _load_quizzes(ctx.quizzes_file)
+        index = _quiz_index(quizzes)
         if mode == "edit":
-            target = None
-            for q in quizzes:
-                if str(q.get("id") or "") == quiz_id:
-                    target = q
-                    break
+            target = index.get(quiz_id)
             if target is None:
                 _QUIZ_WIZARD_STATE.pop(ctx.user_id, None)
                 _send_with_formatting_fallback(
@@ -98,7 +141,7 @@ def handle_quiz_wizard(ctx: BotContext) -> None:
             return
 
         quiz = {"id": quiz_id, "question": question, "answer": answer, "processed": False}
-        if any(str(q.get("id") or "") == quiz_id for q in quizzes):
+        if quiz_id in index:
             _QUIZ_WIZARD_STATE.pop(ctx.user_id, None)
             _send_with_formatting_fallback(
                 tg=ctx.tg,
@@ -140,27 +183,23 @@ def handle_quiz_answer(ctx: BotContext) -> None:
     active_quiz_id = str(active_quiz_id).strip()
 
     quizzes = _load_quizzes(ctx.quizzes_file)
-    quiz: Dict[str, Any] | None = None
-    for q in quizzes:
-        if str(q.get("id") or "").strip() == active_quiz_id:
-            quiz = q
-            break
+    quiz = _quiz_index(quizzes).get(active_quiz_id)
     if quiz is None:
         user_state["active_quiz_id"] = None
         try:
             _save_quiz_state(ctx.quiz_state_file, state)
         except Exception:
-            logging.getLogger(__name__).warning("Failed to save quiz state file %s", ctx.quiz_state_file, exc_info=True)
+            _log.warning("Failed to save quiz state file %s", ctx.quiz_state_file, exc_info=True)
         return
     if _is_hidden_quiz(quiz) and not ctx.is_admin:
         user_state["active_quiz_id"] = None
         try:
             _save_quiz_state(ctx.quiz_state_file, state)
         except Exception:
-            logging.getLogger(__name__).warning("Failed to save quiz state file %s", ctx.quiz_state_file, exc_info=True)
+            _log.warning("Failed to save quiz state file %s", ctx.quiz_state_file, exc_info=True)
         return
 
-    correct_answer = str(quiz.get("answer") or "").strip()
+    correct_answer = _sid(quiz, "answer")
     user_answer = text.strip()
     qkey = str(active_quiz_id)
     results = user_state.get("results")
@@ -173,7 +212,7 @@ def handle_quiz_answer(ctx: BotContext) -> None:
 
     is_correct, usage = _judge_quiz_answer(
         llm=ctx.llm,
-        quiz_question=str(quiz.get("question") or "").strip(),
+        quiz_question=_sid(quiz, "question"),
         reference_answer=correct_answer,
         student_answer=user_answer,
     )
@@ -194,7 +233,7 @@ def handle_quiz_answer(ctx: BotContext) -> None:
         try:
             _save_quiz_state(ctx.quiz_state_file, state)
         except Exception:
-            logging.getLogger(__name__).warning("Failed to save quiz state file %s", ctx.quiz_state_file, exc_info=True)
+            _log.warning("Failed to save quiz state file %s", ctx.quiz_state_file, exc_info=True)
         _send_with_formatting_fallback(
             tg=ctx.tg,
             chat_id=ctx.chat_id,
@@ -208,7 +247,7 @@ def handle_quiz_answer(ctx: BotContext) -> None:
     for q in quizzes:
         if _is_hidden_quiz(q):
             continue
-        qid = str(q.get("id") or "").strip()
+        qid = _sid(q, "id")
         r = results.get(qid)
         if isinstance(r, dict) and bool(r.get("correct")):
             continue
@@ -220,7 +259,7 @@ def handle_quiz_answer(ctx: BotContext) -> None:
         try:
             _save_quiz_state(ctx.quiz_state_file, state)
         except Exception:
-            logging.getLogger(__name__).warning("Failed to save quiz state file %s", ctx.quiz_state_file, exc_info=True)
+            _log.warning("Failed to save quiz state file %s", ctx.quiz_state_file, exc_info=True)
         _send_with_formatting_fallback(
             tg=ctx.tg,
             chat_id=ctx.chat_id,
@@ -235,19 +274,19 @@ def handle_quiz_answer(ctx: BotContext) -> None:
         )
         return
 
-    next_qid = str(next_quiz_item.get("id") or "").strip()
+    next_qid = _sid(next_quiz_item, "id")
     user_state["active_quiz_id"] = next_qid
     try:
         _save_quiz_state(ctx.quiz_state_file, state)
     except Exception:
-        logging.getLogger(__name__).warning("Failed to save quiz state file %s", ctx.quiz_state_file, exc_info=True)
+        _log.warning("Failed to save quiz state file %s", ctx.quiz_state_file, exc_info=True)
     _send_with_formatting_fallback(
         tg=ctx.tg,
         chat_id=ctx.chat_id,
         message_thread_id=ctx.message_thread_id,
         text="Правильно! Поздравляю.",
     )
-    question = str(next_quiz_item.get("question") or "").strip()
+    question = _sid(next_quiz_item, "question")
     _send_with_formatting_fallback(
         tg=ctx.tg,
         chat_id=ctx.chat_id,
@@ -284,9 +323,9 @@ def handle_quiz(ctx: BotContext) -> None:
 
     # If already in progress, resend question
     if active_quiz_id:
-        quiz = next((q for q in quizzes if str(q.get("id") or "").strip() == active_quiz_id), None)
+        quiz = _quiz_index(quizzes).get(active_quiz_id)
         if isinstance(quiz, dict):
-            question = str(quiz.get("question") or "").strip()
+            question = _sid(quiz, "question")
             _send_with_formatting_fallback(
                 tg=ctx.tg,
                 chat_id=ctx.chat_id,
@@ -303,7 +342,7 @@ def handle_quiz(ctx: BotContext) -> None:
 
     next_quiz: Dict[str, Any] | None = None
     for q in quizzes:
-        qid = str(q.get("id") or "").strip()
+        qid = _sid(q, "id")
         r = results.get(qid)
         if isinstance(r, dict) and bool(r.get("correct")):
             continue
@@ -319,14 +358,14 @@ def handle_quiz(ctx: BotContext) -> None:
         )
         return
 
-    qid = str(next_quiz.get("id") or "").strip()
+    qid = _sid(next_quiz, "id")
     user_state["active_quiz_id"] = qid
     try:
         _save_quiz_state(ctx.quiz_state_file, state)
     except Exception:
-        logging.getLogger(__name__).warning("Failed to save quiz state file %s", ctx.quiz_state_file, exc_info=True)
+        _log.warning("Failed to save quiz state file %s", ctx.quiz_state_file, exc_info=True)
 
-    question = str(next_quiz.get("question") or "").strip()
+    question = _sid(next_quiz, "question")
     _send_with_formatting_fallback(
         tg=ctx.tg,
         chat_id=ctx.chat_id,
@@ -362,39 +401,37 @@ def handle_skip(ctx: BotContext) -> None:
         results = {}
         user_state["results"] = results
 
+    # One pass finds both candidates: the first unsolved quiz other than
+    # the active one (preferred) and the first unsolved quiz overall (the
+    # fallback the second scan used to re-discover).
     next_quiz: Dict[str, Any] | None = None
+    fallback_quiz: Dict[str, Any] | None = None
     for q in quizzes:
-        qid = str(q.get("id") or "").strip()
-        if not qid or qid == active_quiz_id:
+        qid = _sid(q, "id")
+        if not qid:
             continue
         r = results.get(qid)
         if isinstance(r, dict) and bool(r.get("correct")):
             continue
-        next_quiz = q
-        break
-
-    if next_quiz is None:
-        for q in quizzes:
-            qid = str(q.get("id") or "").strip()
-            if not qid:
-                continue
-            r = results.get(qid)
-            if isinstance(r, dict) and bool(r.get("correct")):
-                continue
+        if fallback_quiz is None:
+            fallback_quiz = q
+        if qid != active_quiz_id:
             next_quiz = q
             break
 
+    if next_quiz is None:
+        next_quiz = fallback_quiz
     if next_quiz is None:
         return
 
-    qid = str(next_quiz.get("id") or "").strip()
+    qid = _sid(next_quiz, "id")
     user_state["active_quiz_id"] = qid
     try:
         _save_quiz_state(ctx.quiz_state_file, state)
     except Exception:
-        logging.getLogger(__name__).warning("Failed to save quiz state file %s", ctx.quiz_state_file, exc_info=True)
+        _log.warning("Failed to save quiz state file %s", ctx.quiz_state_file, exc_info=True)
 
-    question = str(next_quiz.get("question") or "").strip()
+    question = _sid(next_quiz, "question")
     _send_with_formatting_fallback(
         tg=ctx.tg,
         chat_id=ctx.chat_id,
@@ -432,7 +469,7 @@ def handle_quiz_ask(ctx: BotContext) -> None:
         return
 
     quizzes = _load_quizzes(ctx.quizzes_file)
-    quiz = next((q for q in quizzes if str(q.get("id") or "").strip() == quiz_id), None)
+    quiz = _quiz_index(quizzes).get(quiz_id)
     if not isinstance(quiz, dict):
         _send_with_formatting_fallback(
             tg=ctx.tg,
@@ -448,9 +485,9 @@ def handle_quiz_ask(ctx: BotContext) -> None:
     try:
         _save_quiz_state(ctx.quiz_state_file, state)
     except Exception:
-        logging.getLogger(__name__).warning("Failed to save quiz state file %s", ctx.quiz_state_file, exc_info=True)
+        _log.warning("Failed to save quiz state file %s", ctx.quiz_state_file, exc_info=True)
 
-    question = str(quiz.get("question") or "").strip()
+    question = _sid(quiz, "question")
     _send_with_formatting_fallback(
         tg=ctx.tg,
         chat_id=ctx.chat_id,
@@ -488,7 +525,7 @@ def handle_quiz_create(ctx: BotContext) -> None:
         return
 
     quizzes = _load_quizzes(ctx.quizzes_file)
-    if any(str(q.get("id") or "") == quiz_id for q in quizzes):
+    if quiz_id in _quiz_index(quizzes):
         _send_with_formatting_fallback(
             tg=ctx.tg,
             chat_id=ctx.chat_id,
@@ -526,33 +563,35 @@ def handle_quiz_list(ctx: BotContext) -> None:
         )
         return
 
-    for q in quizzes:
-        qid = str(q.get("id") or "").strip()
-        question = str(q.get("question") or "").strip()
-        answer = str(q.get("answer") or "").strip()
-        processed = bool(q.get("processed"))
-        hidden = _is_hidden_quiz(q)
-        toggle_text = "Показать (hidden=false)" if hidden else "Скрыть (hidden=true)"
-        buttons: list[list[Dict[str, str]]] = [
-            [{"text": toggle_text, "callback_data": f"quiz_toggle_hidden:{qid}"}],
-            [{"text": "Редактировать", "callback_data": f"quiz_edit:{qid}"}],
-        ]
-        if not hidden:
-            buttons.append([{"text": "Отправить администраторам", "callback_data": f"quiz_send_admins:{qid}"}])
-        reply_markup = {"inline_keyboard": buttons}
+    # One message per ~3500 chars of cards instead of one per quiz: each
+    # page carries a combined keyboard with one action row per quiz.
+    cards: list[str] = []
+    rows: list[list[Dict[str, str]]] = []
+    page_len = 0
+
+    def _flush_page() -> None:
+        nonlocal cards, rows, page_len
+        if not cards:
+            return
         ctx.tg.send_message(
             chat_id=ctx.chat_id,
             message_thread_id=ctx.message_thread_id,
             parse_mode=None,
-            message=(
-                f"Квиз: {qid}\n"
-                f"processed: {str(processed).lower()}\n"
-                f"hidden: {str(hidden).lower()}\n"
-                f"Вопрос: {question}\n"
-                f"Ответ: {answer}"
-            ),
-            reply_markup=reply_markup,
+            message="\n\n".join(cards),
+            reply_markup={"inline_keyboard": rows},
         )
+        cards = []
+        rows = []
+        page_len = 0
+
+    for q in quizzes:
+        card = _quiz_card_text(q)
+        if cards and page_len + len(card) + 2 > _QUIZ_LIST_PAGE_CHARS:
+            _flush_page()
+        cards.append(card)
+        rows.append(_quiz_buttons_row(q))
+        page_len += len(card) + 2
+    _flush_page()
 
 
 def handle_quiz_delete(ctx: BotContext) -> None:
@@ -576,11 +615,7 @@ def handle_quiz_delete(ctx: BotContext) -> None:
         return
 
     quizzes = _load_quizzes(ctx.quizzes_file)
-    before = len(quizzes)
-    quizzes = [q for q in quizzes if str(q.get("id") or "") != quiz_id]
-    after = len(quizzes)
-
-    if after == before:
+    if quiz_id not in _quiz_index(quizzes):
         _send_with_formatting_fallback(
             tg=ctx.tg,
             chat_id=ctx.chat_id,
@@ -589,6 +624,8 @@ def handle_quiz_delete(ctx: BotContext) -> None:
         )
         return
 
+    quizzes = [q for q in quizzes if str(q.get("id") or "") != quiz_id]
+
     try:
         _save_quizzes(quizzes_file=ctx.quizzes_file, quizzes=quizzes)
     except Exception as e:
@@ -644,11 +681,16 @@ def handle_quiz_stat(ctx: BotContext) -> None:
     active_quiz_id = str(active_quiz_id).strip() if active_quiz_id is not None else ""
 
     lines = ["Статистика по квизам:"]
+    results_get = results.get  # results is a plain dict by this point
     for q in quizzes:
-        qid = str(q.get("id") or "").strip()
-        r = results.get(qid) if isinstance(results, dict) else None
-        correct = bool((r or {}).get("correct")) if isinstance(r, dict) else False
-        attempts = int((r or {}).get("attempts") or 0) if isinstance(r, dict) else 0
+        qid = _sid(q, "id")
+        r = results_get(qid)
+        if isinstance(r, dict):
+            correct = bool(r.get("correct"))
+            attempts = int(r.get("attempts") or 0)
+        else:
+            correct = False
+            attempts = 0
 
         if correct:
             emoji = "✅"
@@ -707,8 +749,7 @@ def handle_quiz_admin_stat(ctx: BotContext) -> None:
     else:
         course_chat_id_int = 0
 
-    student_user_ids: list[int] = []
-    membership_errors = 0
+    candidate_ids: list[int] = []
     for k, v in users_map.items():
         if not isinstance(v, dict):
             continue
@@ -718,16 +759,17 @@ def handle_quiz_admin_stat(ctx: BotContext) -> None:
             continue
         if uid <= 0:
             continue
-        if not filter_by_course:
-            student_user_ids.append(uid)
-            continue
-        try:
-            member = ctx.tg.get_chat_member(chat_id=course_chat_id_int, user_id=uid)
-            status = str((member.get("result") or {}).get("status") or "")
-            if status in {"creator", "administrator", "member", "restricted"}:
-                student_user_ids.append(uid)
-        except Exception:
-            membership_errors += 1
+        candidate_ids.append(uid)
+
+    membership_errors = 0
+    if filter_by_course:
+        student_user_ids, membership_errors = _filter_course_members(
+            tg=ctx.tg,
+            chat_id=course_chat_id_int,
+            user_ids=candidate_ids,
+        )
+    else:
+        student_user_ids = candidate_ids
 
     if not student_user_ids:
         _send_with_formatting_fallback(
@@ -738,20 +780,27 @@ def handle_quiz_admin_stat(ctx: BotContext) -> None:
         )
         return
 
-    quiz_ids = [str(q.get("id") or "").strip() for q in quizzes]
-    quiz_ids = [qid for qid in quiz_ids if qid]
-    hidden_by_id: dict[str, bool] = {
-        str(q.get("id") or "").strip(): _is_hidden_quiz(q)
-        for q in quizzes
-        if str(q.get("id") or "").strip()
-    }
+    # Interned ids make the results.get(qid)/attempt_stats[qid] lookups in
+    # the per-student loop compare by pointer instead of by characters.
+    quiz_ids: list[str] = []
+    hidden_by_id: dict[str, bool] = {}
+    for q in quizzes:
+        qid = _sid(q, "id")
+        if not qid:
+            continue
+        qid = sys.intern(qid)
+        quiz_ids.append(qid)
+        hidden_by_id[qid] = _is_hidden_quiz(q)
 
     passed_any = 0
     passed_all = 0
-    attempts_by_quiz: dict[str, list[int]] = {qid: [] for qid in quiz_ids}
+    # Running (count, sum, sum of squares) per quiz instead of materialized
+    # attempt lists; mean/std come straight from the accumulators.
+    attempt_stats: dict[str, list[int]] = {qid: [0, 0, 0] for qid in quiz_ids}
 
+    users_map_get = users_map.get
     for uid in student_user_ids:
-        u = users_map.get(str(uid))
+        u = users_map_get(str(uid))
         if not isinstance(u, dict):
             continue
         results = u.get("results")
@@ -760,13 +809,17 @@ def handle_quiz_admin_stat(ctx: BotContext) -> None:
 
         any_correct = False
         all_correct = True
+        results_get = results.get
         for qid in quiz_ids:
-            r = results.get(qid)
+            r = results_get(qid)
             correct = bool((r or {}).get("correct")) if isinstance(r, dict) else False
             attempts = int((r or {}).get("attempts") or 0) if isinstance(r, dict) else 0
             if correct:
                 any_correct = True
-                attempts_by_quiz[qid].append(attempts)
+                acc = attempt_stats[qid]
+                acc[0] += 1
+                acc[1] += attempts
+                acc[2] += attempts * attempts
             else:
                 all_correct = False
         if any_correct:
@@ -774,13 +827,6 @@ def handle_quiz_admin_stat(ctx: BotContext) -> None:
         if all_correct and quiz_ids:
             passed_all += 1
 
-    def _mean_std(values: list[int]) -> tuple[float, float]:
-        if not values:
-            return (0.0, 0.0)
-        m = sum(values) / len(values)
-        var = sum((x - m) ** 2 for x in values) / len(values)
-        return (m, math.sqrt(var))
-
     lines = [
         "Статистика по квизам (по студентам):",
         f"- студентов учтено: {len(student_user_ids)}",
@@ -795,13 +841,14 @@ def handle_quiz_admin_stat(ctx: BotContext) -> None:
     lines.append("")
     lines.append("По квизам (mean/std attempts среди тех, кто решил):")
     for qid in quiz_ids:
-        vals = attempts_by_quiz.get(qid) or []
-        m, s = _mean_std(vals)
+        n, total, sq_total = attempt_stats[qid]
         prefix = "🙈 " if hidden_by_id.get(qid, False) else ""
-        if not vals:
+        if n == 0:
             lines.append(f"- {prefix}{qid}: solved=0, mean/std=N/A")
         else:
-            lines.append(f"- {prefix}{qid}: solved={len(vals)}, mean={m:.2f}, std={s:.2f}")
+            m = total / n
+            s = math.sqrt(max(sq_total / n - m * m, 0.0))
+            lines.append(f"- {prefix}{qid}: solved={n}, mean={m:.2f}, std={s:.2f}")
 
     _send_with_formatting_fallback(
         tg=ctx.tg,
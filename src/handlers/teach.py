@@ -22,6 +22,8 @@ from github_client import (
     get_latest_seminar_notebook_path as github_get_latest_seminar_notebook_path,
 )
 
+_log = logging.getLogger(__name__)
+
 
 def _seminar_week_from_notebook_path(notebook_path: str) -> int | None:
     """
@@ -88,7 +90,7 @@ def handle_teach(ctx: BotContext) -> None:
                 credentials_path=creds_path,
             )
             if not form_result:
-                logging.getLogger(__name__).warning(
+                _log.warning(
                     "teach/form: создание формы не удалось (folder_id=%s, title=%s)",
                     folder_id,
                     form_title,
@@ -135,8 +137,7 @@ def handle_teach(ctx: BotContext) -> None:
     #     )
 
     if not md_lines:
-        _teach_log = logging.getLogger(__name__)
-        _teach_log.warning(
+        _log.warning(
             "teach: ничего не удалось получить: path=%s, colab_url=%s, lecture_url=%s, form_result=%s, "
             "folder_id=%s, creds_path=%s",
             path,
@@ -0,0 +1,78 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any
+
+# orjson parses ~2x and serializes ~10x faster than the stdlib for the small
+# JSON payloads this bot shuffles on every update; fall back to the stdlib so
+# a deployment without the wheel still works.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _json_loads(data: bytes | str) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _json_dumps_pretty(obj: Any) -> bytes:
+    """
+    Serialize for on-disk snapshots: 2-space indent plus trailing newline,
+    matching the format the stdlib writer produced.
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2) + b"\n"
+    return (json.dumps(obj, ensure_ascii=False, indent=2) + "\n").encode("utf-8")
+
+
+def _json_dumps_line(obj: Any) -> bytes:
+    """Serialize compactly as one JSONL line with trailing newline."""
+    if orjson is not None:
+        return orjson.dumps(obj) + b"\n"
+    return (json.dumps(obj, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+def _numeric_str_key(k: Any) -> tuple[int, int | str]:
+    """
+    Sort key that orders numeric string keys numerically before everything
+    else; shared by the savers that emit deterministic JSON snapshots.
+    """
+    s = str(k)
+    if s.lstrip("-").isdigit():
+        return (0, int(s))
+    return (1, s)
+
+
+def _safe_write_bytes(path: Path, data: bytes) -> None:
+    """
+    Atomically replace `path` with `data`.
+
+    Four-phase protocol: write to an exclusive tmp file and fsync it, read the
+    bytes back and compare hashes to catch a torn or corrupted write, rename
+    over the target, then fsync the parent directory so the rename itself
+    survives a crash.
+    """
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    try:
+        tmp_path.unlink()
+    except FileNotFoundError:
+        pass
+    fd = os.open(tmp_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+    try:
+        os.write(fd, data)
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+    if hashlib.sha256(tmp_path.read_bytes()).digest() != hashlib.sha256(data).digest():
+        tmp_path.unlink()
+        raise OSError(f"Read-back verification failed while writing {path}")
+    os.replace(tmp_path, path)
+    dir_fd = os.open(path.parent, os.O_RDONLY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
@@ -1,4 +1,7 @@
+import functools
 import logging
+import re
+import time
 from typing import Any, Dict, Tuple
 
 import requests
@@ -8,10 +11,37 @@ from openai.types.chat import ChatCompletionMessageParam
 from constants import OPENAI_MODEL, README_URL
 from logging_utils import _extract_openai_usage
 
+_log = logging.getLogger(__name__)
+
+# The README is identical across /qa calls for minutes at a time; cache it
+# with a TTL and revalidate with the ETag so a warm call costs nothing and
+# a stale one usually costs a 304 instead of the full body.
+_README_CACHE: Dict[str, Any] = {"text": None, "etag": None, "expires": 0.0}
+_README_TTL = 300.0
+
+# Shared session keeps the TLS connection to the README host alive across
+# revalidations instead of paying a fresh handshake per fetch.
+_HTTP = requests.Session()
+
 
 def _fetch_readme() -> str:
-    resp = requests.get(README_URL, timeout=20)
+    if _README_CACHE["text"] is not None and time.monotonic() < _README_CACHE["expires"]:
+        return _README_CACHE["text"]
+    headers = {}
+    if _README_CACHE["etag"] and _README_CACHE["text"] is not None:
+        headers["If-None-Match"] = _README_CACHE["etag"]
+    resp = _HTTP.get(README_URL, headers=headers, timeout=20)
+    if resp.status_code == 304 and _README_CACHE["text"] is not None:
+        _README_CACHE["expires"] = time.monotonic() + _README_TTL
+        return _README_CACHE["text"]
     resp.raise_for_status()
+    _README_CACHE.update(
+        {
+            "text": resp.text,
+            "etag": resp.headers.get("ETag"),
+            "expires": time.monotonic() + _README_TTL,
+        }
+    )
     return resp.text
 
 
@@ -104,17 +134,32 @@ def _judge_quiz_answer(
             ],
         )
         content = (resp.choices[0].message.content or "").strip().lower()
-        print("judge resp content", content)
+        _log.debug("judge response: %s", content)
         if content.startswith("true"):
             return True, _extract_openai_usage(resp)
         if content.startswith("false"):
             return False, _extract_openai_usage(resp)
         raise ValueError(f"Unexpected judge output: {content!r}")
     except Exception:
-        logging.getLogger(__name__).warning("Judge failed; fallback to strict equality", exc_info=True)
+        _log.warning("Judge failed; fallback to strict equality", exc_info=True)
         return student_answer.strip() == reference_answer.strip(), {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
 
 
+_WORD_RE = re.compile(r"\w+")
+
+# Jaccard similarity bands for the paraphrase prefilter: below the lower
+# bound the question clearly differs from every quiz question, above the
+# upper bound it is a near-verbatim copy; only the ambiguous middle goes
+# to the LLM.
+_PARAPHRASE_JACCARD_LOW = 0.15
+_PARAPHRASE_JACCARD_HIGH = 0.85
+
+
+@functools.lru_cache(maxsize=256)
+def _question_token_set(text: str) -> frozenset[str]:
+    return frozenset(_WORD_RE.findall(text.lower()))
+
+
 def _is_quiz_question_paraphrase(
     llm: OpenAI,
     *,
@@ -143,6 +188,29 @@ def _is_quiz_question_paraphrase(
     if not items:
         return False, {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
 
+    # Cheap local prefilter: token-set Jaccard against every quiz question.
+    # Clear non-matches and verbatim copies are decided without spending an
+    # LLM round-trip (and its tokens).
+    user_toks = _question_token_set(str(user_question or "").strip().lower())
+    if user_toks:
+        max_jaccard = 0.0
+        for q in quiz_questions:
+            if not isinstance(q, dict):
+                continue
+            quiz_toks = _question_token_set(str(q.get("question") or "").strip())
+            if not quiz_toks:
+                continue
+            intersection = len(user_toks & quiz_toks)
+            if not intersection:
+                continue
+            jaccard = intersection / len(user_toks | quiz_toks)
+            if jaccard > max_jaccard:
+                max_jaccard = jaccard
+        if max_jaccard < _PARAPHRASE_JACCARD_LOW:
+            return False, {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+        if max_jaccard > _PARAPHRASE_JACCARD_HIGH:
+            return True, {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+
     system = (
         "You are a strict classifier.\n"
         "Decide whether USER_QUESTION is essentially the same question as ANY item in QUIZ_QUESTIONS "
@@ -182,5 +250,5 @@ def _is_quiz_question_paraphrase(
             return False, _extract_openai_usage(resp)
         raise ValueError(f"Unexpected paraphrase-check output: {content!r}")
     except Exception:
-        logging.getLogger(__name__).warning("Paraphrase check failed; defaulting to false", exc_info=True)
+        _log.warning("Paraphrase check failed; defaulting to false", exc_info=True)
         return False, {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
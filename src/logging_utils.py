@@ -1,18 +1,201 @@
-import json
+import atexit
+import heapq
 import logging
+import threading
+import time
+from operator import itemgetter
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Any, Dict, Tuple
 
 from command_utils import _is_command_for_this_bot
+from json_utils import _json_dumps_line, _json_loads
+
+_log = logging.getLogger(__name__)
+
+_GROUP_CHAT_TYPES = frozenset({"group", "supergroup"})
+
+# Open append handles per JSONL log, so each record costs one buffered
+# write instead of an open/write/close syscall triple. Data is flushed at
+# most every _FLUSH_INTERVAL seconds, before any read, and at exit.
+_APPENDERS: dict[str, tuple[Any, threading.Lock]] = {}
+_APPENDERS_LOCK = threading.Lock()
+_LAST_FLUSH: dict[str, float] = {}
+_UNFLUSHED: dict[str, int] = {}
+_FLUSH_INTERVAL = 1.0
+_FLUSH_EVERY_N = 16
+
+
+def _get_appender(path_str: str) -> tuple[Any, threading.Lock]:
+    with _APPENDERS_LOCK:
+        entry = _APPENDERS.get(path_str)
+        if entry is None:
+            path = Path(path_str)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            entry = (path.open("ab", buffering=64 * 1024), threading.Lock())
+            _APPENDERS[path_str] = entry
+        return entry
+
+
+def _flush_appender(path_str: str) -> None:
+    """Push buffered records to disk; call before reading the log."""
+    with _APPENDERS_LOCK:
+        entry = _APPENDERS.get(path_str)
+    if entry is None:
+        return
+    fh, lock = entry
+    with lock:
+        try:
+            fh.flush()
+            _UNFLUSHED[path_str] = 0
+        except Exception:
+            _log.warning("Failed to flush log %s", path_str, exc_info=True)
+
+
+def _close_appenders() -> None:
+    with _APPENDERS_LOCK:
+        entries = list(_APPENDERS.values())
+        _APPENDERS.clear()
+    for fh, lock in entries:
+        with lock:
+            try:
+                fh.flush()
+                fh.close()
+            except Exception:
+                pass
+
+
+atexit.register(_close_appenders)
+
+
+# Incremental token-usage aggregates keyed by log path. Records are folded
+# in as they are appended, so /tokens_stat only tail-scans bytes the
+# aggregate has not seen yet (a full scan happens once per process start).
+_TOKENS_AGG: dict[str, Dict[str, Any]] = {}
+_TOKENS_AGG_LOCK = threading.Lock()
+
+
+def _fold_token_record(agg: Dict[str, Any], rec: Dict[str, Any]) -> None:
+    if rec.get("record_type") != "tokens":
+        return
+    try:
+        t = int(rec.get("total_tokens") or 0)
+        uid = int(rec.get("user_id") or 0)
+    except (TypeError, ValueError):
+        return
+    if t <= 0 or uid <= 0:
+        return
+    agg["total"] += t
+    per_user = agg["per_user"]
+    per_user[uid] = per_user.get(uid, 0) + t
+    uname = str(rec.get("username") or "")
+    if uname:
+        agg["usernames"][uid] = uname
+
+
+def _note_appended_record(path_str: str, record: Dict[str, Any], nbytes: int) -> None:
+    with _TOKENS_AGG_LOCK:
+        agg = _TOKENS_AGG.get(path_str)
+        if agg is None:
+            return
+        agg["offset"] += nbytes
+        _fold_token_record(agg, record)
+
+
+# Distinct user_ids seen in each JSONL log, mirrored to a "<log>.users"
+# sidecar so quiz broadcasts do not have to re-parse the whole log.
+_PM_USER_INDEX: dict[str, set[int]] = {}
+_PM_USER_INDEX_LOCK = threading.Lock()
+
+
+def _load_pm_user_index(path_str: str) -> set[int]:
+    """
+    Return the live set of distinct user_ids for a JSONL log.
+
+    Loaded from the sidecar when present; otherwise rebuilt with one full
+    scan of the log and snapshotted to the sidecar for the next start.
+    """
+    with _PM_USER_INDEX_LOCK:
+        users = _PM_USER_INDEX.get(path_str)
+    if users is not None:
+        return users
+    users = set()
+    sidecar = Path(path_str + ".users")
+    if sidecar.exists():
+        try:
+            for token in sidecar.read_text(encoding="utf-8").split():
+                try:
+                    users.add(int(token))
+                except ValueError:
+                    continue
+        except OSError:
+            users = set()
+    if not users:
+        _flush_appender(path_str)
+        path = Path(path_str)
+        if path.exists():
+            try:
+                with path.open("rb") as f:
+                    for line in f:
+                        line = line.strip()
+                        if not line:
+                            continue
+                        try:
+                            rec = _json_loads(line)
+                            uid = int((rec or {}).get("user_id") or 0)
+                        except Exception:
+                            continue
+                        if uid > 0:
+                            users.add(uid)
+            except OSError:
+                pass
+        if users:
+            try:
+                sidecar.write_text("".join(f"{uid}\n" for uid in sorted(users)), encoding="utf-8")
+            except OSError:
+                pass
+    with _PM_USER_INDEX_LOCK:
+        return _PM_USER_INDEX.setdefault(path_str, users)
+
+
+def _pm_user_ids(path_str: str) -> set[int]:
+    """Distinct user_ids that ever wrote to the log (copy, safe to mutate)."""
+    return set(_load_pm_user_index(path_str))
+
+
+def _note_pm_user(path_str: str, user_id: int) -> None:
+    users = _load_pm_user_index(path_str)
+    with _PM_USER_INDEX_LOCK:
+        if user_id in users:
+            return
+        users.add(user_id)
+    try:
+        with open(path_str + ".users", "a", encoding="utf-8") as f:
+            f.write(f"{user_id}\n")
+    except OSError:
+        _log.warning(
+            "Failed to update pm user index for %s",
+            path_str,
+            exc_info=True,
+        )
 
 
 def _append_jsonl_record(path_str: str, record: Dict[str, Any]) -> None:
-    path = Path(path_str)
-    path.parent.mkdir(parents=True, exist_ok=True)
-    line = json.dumps(record, ensure_ascii=False) + "\n"
-    with path.open("a", encoding="utf-8") as f:
-        f.write(line)
+    fh, lock = _get_appender(path_str)
+    line = _json_dumps_line(record)
+    now = time.monotonic()
+    with lock:
+        fh.write(line)
+        pending = _UNFLUSHED.get(path_str, 0) + 1
+        if pending >= _FLUSH_EVERY_N or now - _LAST_FLUSH.get(path_str, 0.0) >= _FLUSH_INTERVAL:
+            fh.flush()
+            _LAST_FLUSH[path_str] = now
+            pending = 0
+        _UNFLUSHED[path_str] = pending
+    _note_appended_record(path_str, record, len(line))
+    uid = record.get("user_id")
+    if isinstance(uid, int) and uid > 0:
+        _note_pm_user(path_str, uid)
 
 
 def _get_user_fields(message: Dict[str, Any]) -> Dict[str, Any]:
@@ -33,6 +216,9 @@ def _log_private_message(
     bot_username: str,
     request_id: str,
     cmd: str,
+    *,
+    ts: str | None = None,
+    user_fields: Dict[str, Any] | None = None,
 ) -> bool:
     chat = message.get("chat") or {}
     if not isinstance(chat, dict):
@@ -45,7 +231,7 @@ def _log_private_message(
     # Additionally: log group/supergroup messages ONLY if they are commands for this bot.
     if chat_type == "private":
         pass
-    elif chat_type in {"group", "supergroup"}:
+    elif chat_type in _GROUP_CHAT_TYPES:
         if not _is_command_for_this_bot(text=text, bot_username=bot_username):
             return False
     else:
@@ -54,11 +240,11 @@ def _log_private_message(
     record = {
         "record_type": "message",
         "request_id": request_id,
-        "ts": datetime.now(timezone.utc).isoformat(),
+        "ts": ts or datetime.now(timezone.utc).isoformat(),
         "message_date": int(message.get("date") or 0),
         "chat_id": int(chat.get("id") or 0),
         "chat_type": chat_type,
-        **_get_user_fields(message),
+        **(user_fields if user_fields is not None else _get_user_fields(message)),
         "message_id": int(message.get("message_id") or 0),
         "text": str(message.get("text") or ""),
         "cmd": str(cmd or ""),
@@ -67,7 +253,7 @@ def _log_private_message(
     try:
         _append_jsonl_record(pm_log_file, record)
     except Exception:
-        logging.getLogger(__name__).warning(
+        _log.warning(
             "Failed to write private message log to %s",
             pm_log_file,
             exc_info=True,
@@ -82,14 +268,20 @@ def _extract_openai_usage(resp: Any) -> Dict[str, int]:
     Returns dict with: prompt_tokens, completion_tokens, total_tokens (all ints >= 0).
     """
     usage = getattr(resp, "usage", None)
-    prompt = int(getattr(usage, "prompt_tokens", 0) or 0) if usage is not None else 0
-    completion = int(getattr(usage, "completion_tokens", 0) or 0) if usage is not None else 0
-    total = int(getattr(usage, "total_tokens", 0) or 0) if usage is not None else 0
-    return {
-        "prompt_tokens": max(0, prompt),
-        "completion_tokens": max(0, completion),
-        "total_tokens": max(0, total),
-    }
+    if usage is None:
+        return {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+    try:
+        return {
+            "prompt_tokens": max(0, usage.prompt_tokens or 0),
+            "completion_tokens": max(0, usage.completion_tokens or 0),
+            "total_tokens": max(0, usage.total_tokens or 0),
+        }
+    except (AttributeError, TypeError):
+        return {
+            "prompt_tokens": max(0, int(getattr(usage, "prompt_tokens", 0) or 0)),
+            "completion_tokens": max(0, int(getattr(usage, "completion_tokens", 0) or 0)),
+            "total_tokens": max(0, int(getattr(usage, "total_tokens", 0) or 0)),
+        }
 
 
 def _log_token_usage(
@@ -101,6 +293,8 @@ def _log_token_usage(
     purpose: str,
     model: str,
     usage: Dict[str, int],
+    ts: str | None = None,
+    user_fields: Dict[str, Any] | None = None,
 ) -> None:
     chat = message.get("chat") or {}
     if not isinstance(chat, dict):
@@ -108,11 +302,11 @@ def _log_token_usage(
     record = {
         "record_type": "tokens",
         "request_id": request_id,
-        "ts": datetime.now(timezone.utc).isoformat(),
+        "ts": ts or datetime.now(timezone.utc).isoformat(),
         "message_date": int(message.get("date") or 0),
         "chat_id": int(chat.get("id") or 0),
         "chat_type": str(chat.get("type") or ""),
-        **_get_user_fields(message),
+        **(user_fields if user_fields is not None else _get_user_fields(message)),
         "message_id": int(message.get("message_id") or 0),
         "cmd": str(cmd or ""),
         "purpose": str(purpose or ""),
@@ -124,7 +318,7 @@ def _log_token_usage(
     try:
         _append_jsonl_record(pm_log_file, record)
     except Exception:
-        logging.getLogger(__name__).warning(
+        _log.warning(
             "Failed to write token usage log to %s",
             pm_log_file,
             exc_info=True,
@@ -135,44 +329,47 @@ def _tokens_stat_from_log(pm_log_file: str) -> Tuple[int, list[Tuple[int, str, i
     """
     Returns: (total_tokens, top_users) where top_users is list of (user_id, username, total_tokens).
     """
+    _flush_appender(pm_log_file)
     path = Path(pm_log_file)
-    if not path.exists():
-        return 0, []
 
-    total = 0
-    per_user: dict[int, int] = {}
-    usernames: dict[int, str] = {}
+    with _TOKENS_AGG_LOCK:
+        agg = _TOKENS_AGG.setdefault(
+            pm_log_file,
+            {"total": 0, "per_user": {}, "usernames": {}, "offset": 0},
+        )
+        try:
+            if path.exists():
+                if path.stat().st_size < agg["offset"]:
+                    # Log was truncated or rotated; start the fold over.
+                    agg.update({"total": 0, "per_user": {}, "usernames": {}, "offset": 0})
+                with path.open("rb") as f:
+                    f.seek(agg["offset"])
+                    for line in f:
+                        # Cheap substring prefilter: every tokens record
+                        # contains b"tokens" (record_type and the *_tokens
+                        # keys), so the vast majority of message records are
+                        # skipped without a JSON parse. False positives are
+                        # filtered by _fold_token_record after parsing.
+                        if b"tokens" not in line:
+                            continue
+                        line = line.strip()
+                        if not line:
+                            continue
+                        try:
+                            rec = _json_loads(line)
+                        except Exception:
+                            continue
+                        if isinstance(rec, dict):
+                            _fold_token_record(agg, rec)
+                    agg["offset"] = f.tell()
+        except Exception:
+            _log.warning("Failed to read tokens stats from %s", pm_log_file, exc_info=True)
+            return 0, []
 
-    try:
-        with path.open("r", encoding="utf-8") as f:
-            for line in f:
-                line = line.strip()
-                if not line:
-                    continue
-                try:
-                    rec = json.loads(line)
-                except Exception:
-                    continue
-                if not isinstance(rec, dict):
-                    continue
-                if rec.get("record_type") != "tokens":
-                    continue
-                t = int(rec.get("total_tokens") or 0)
-                if t <= 0:
-                    continue
-                uid = int(rec.get("user_id") or 0)
-                if uid <= 0:
-                    continue
-                total += t
-                per_user[uid] = per_user.get(uid, 0) + t
-                uname = str(rec.get("username") or "")
-                if uname:
-                    usernames[uid] = uname
-    except Exception:
-        logging.getLogger(__name__).warning("Failed to read tokens stats from %s", pm_log_file, exc_info=True)
-        return 0, []
+        total = agg["total"]
+        top = heapq.nlargest(5, agg["per_user"].items(), key=itemgetter(1))
+        usernames = agg["usernames"]
 
-    top = sorted(per_user.items(), key=lambda kv: kv[1], reverse=True)[:5]
     top_users: list[Tuple[int, str, int]] = []
     for uid, t in top:
         top_users.append((uid, usernames.get(uid, ""), t))
@@ -0,0 +1,90 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Iterable
+
+from telegram_client import TelegramClient
+
+_log = logging.getLogger(__name__)
+
+# Statuses that count as "present in the chat" for the three checks the
+# bot performs: course membership, bot-as-admin, bot-as-member.
+_COURSE_MEMBER_STATUSES = frozenset({"creator", "administrator", "member", "restricted"})
+_ADMIN_STATUSES = frozenset({"administrator", "creator"})
+_BACKUP_STATUSES = frozenset({"administrator", "creator", "member"})
+
+# Membership rarely changes between consecutive admin commands, so statuses
+# are cached for a few minutes; the LRU cap bounds memory. Failed checks
+# are never cached, and re-running a command after the TTL re-queries.
+_MEMBER_CACHE: OrderedDict[tuple[int, int], tuple[str, float]] = OrderedDict()
+_MEMBER_CACHE_LOCK = threading.Lock()
+_MEMBER_CACHE_TTL = 300.0
+_MEMBER_CACHE_MAX = 10000
+
+# Bounded pool for per-user get_chat_member round-trips; each check is an
+# independent HTTPS request, so running them concurrently turns N RTTs
+# into roughly N/workers. The worker cap doubles as a rate limit against
+# the Telegram API.
+_TG_POOL = ThreadPoolExecutor(max_workers=16, thread_name_prefix="tg-member")
+
+
+def _status_of(member: Any) -> str:
+    """Status string from a getChatMember response ("" when absent)."""
+    result = member.get("result") if isinstance(member, dict) else None
+    if isinstance(result, dict):
+        return str(result.get("status") or "")
+    return ""
+
+
+def _chat_member_status(tg: TelegramClient, chat_id: int, user_id: int) -> str | None:
+    """
+    Member status of user_id in chat_id, or None if the check failed.
+
+    Successful lookups are served from a TTL cache for _MEMBER_CACHE_TTL
+    seconds.
+    """
+    key = (chat_id, user_id)
+    now = time.monotonic()
+    with _MEMBER_CACHE_LOCK:
+        entry = _MEMBER_CACHE.get(key)
+        if entry is not None:
+            status, ts = entry
+            if now - ts < _MEMBER_CACHE_TTL:
+                _MEMBER_CACHE.move_to_end(key)
+                return status
+            del _MEMBER_CACHE[key]
+    try:
+        status = _status_of(tg.get_chat_member(chat_id=chat_id, user_id=user_id))
+    except Exception:
+        return None
+    with _MEMBER_CACHE_LOCK:
+        _MEMBER_CACHE[key] = (status, now)
+        _MEMBER_CACHE.move_to_end(key)
+        while len(_MEMBER_CACHE) > _MEMBER_CACHE_MAX:
+            _MEMBER_CACHE.popitem(last=False)
+    return status
+
+
+def _filter_course_members(
+    tg: TelegramClient,
+    chat_id: int,
+    user_ids: Iterable[int],
+) -> tuple[list[int], int]:
+    """
+    Check membership of every user_id in chat_id concurrently.
+
+    Returns (members, errors): the sorted subset of user_ids present in the
+    chat and the number of checks that failed.
+    """
+    candidates = sorted(set(user_ids))
+    members: list[int] = []
+    errors = 0
+    statuses = _TG_POOL.map(lambda uid: _chat_member_status(tg, chat_id, uid), candidates)
+    for uid, status in zip(candidates, statuses):
+        if status is None:
+            errors += 1
+        elif status in _COURSE_MEMBER_STATUSES:
+            members.append(uid)
+    return members, errors
@@ -1,7 +1,19 @@
+import functools
 import re
 
 from telegram_client import TelegramClient
 
+# Telegram MarkdownV2 special characters that need escaping in plain text.
+_MD2_PLAIN_RE = re.compile(r"([_*\[\]()~`>#+\-=|{}.!])")
+# Fenced (```...```) and inline (`...`) code spans are preserved verbatim.
+_MD2_CODE_RE = re.compile(r"```[\s\S]*?```|`[^`\n]+`")
+# Bot replies above this length (README answers etc.) bypass the escape
+# cache to keep it from filling up with one-off large strings.
+_MD2_CACHE_MAX_LEN = 4096
+# Characters with MarkdownV2 meaning; text without any of them renders the
+# same in plain mode, so the escape + MarkdownV2 attempt can be skipped.
+_MD2_SPECIAL = frozenset("_*[]()~`>#+-=|{}.!\\")
+
 
 def _escape_markdown_v2_plain(chunk: str) -> str:
     """
@@ -11,7 +23,7 @@ def _escape_markdown_v2_plain(chunk: str) -> str:
     if not chunk:
         return chunk
     chunk = chunk.replace("\\", "\\\\")
-    return re.sub(r"([_*\[\]()~`>#+\-=|{}.!])", r"\\\1", chunk)
+    return _MD2_PLAIN_RE.sub(r"\\\1", chunk)
 
 
 def _md2_link(label: str, url: str) -> str:
@@ -87,30 +99,20 @@ def _format_deadline_ru(deadline_iso: str) -> str:
         return s
 
 
-def _escape_markdown_v2(text: str) -> str:
-    """
-    Escapes text for Telegram MarkdownV2.
-    Docs: https://core.telegram.org/bots/api#markdownv2-style
-    """
-    if text is None:
-        return ""
-
+@functools.lru_cache(maxsize=512)
+def _escape_markdown_v2_cached(s: str) -> str:
     def _escape_plain(chunk: str) -> str:
         chunk = chunk.replace("\\", "\\\\")
         # Telegram MarkdownV2 requires escaping these chars in plain text:
         # _ * [ ] ( ) ~ ` > # + - = | { } . !
-        return re.sub(r"([_*\[\]()~`>#+\-=|{}.!])", r"\\\1", chunk)
-
-    s = str(text)
+        return _MD2_PLAIN_RE.sub(r"\\\1", chunk)
 
     # Preserve fenced and inline code blocks; escape only outside of them.
     # - Fenced: ```...```
     # - Inline: `...` (single-line)
-    code_re = re.compile(r"```[\s\S]*?```|`[^`\n]+`")
-
     out: list[str] = []
     last = 0
-    for m in code_re.finditer(s):
+    for m in _MD2_CODE_RE.finditer(s):
         if m.start() > last:
             out.append(_escape_plain(s[last : m.start()]))
         out.append(m.group(0))
@@ -121,6 +123,23 @@ def _escape_markdown_v2(text: str) -> str:
     return "".join(out)
 
 
+def _escape_markdown_v2(text: str) -> str:
+    """
+    Escapes text for Telegram MarkdownV2.
+    Docs: https://core.telegram.org/bots/api#markdownv2-style
+
+    Fixed strings (help text, wizard prompts) dominate outgoing messages,
+    so short inputs are memoized; long one-off bodies skip the cache.
+    """
+    if text is None:
+        return ""
+
+    s = str(text)
+    if len(s) < _MD2_CACHE_MAX_LEN:
+        return _escape_markdown_v2_cached(s)
+    return _escape_markdown_v2_cached.__wrapped__(s)
+
+
 
 def _send_with_formatting_fallback(
     tg: TelegramClient,
@@ -151,6 +170,16 @@ def _send_with_formatting_fallback(
         )
         return True
 
+    plain = str(text) if text is not None else ""
+    if _MD2_SPECIAL.isdisjoint(plain):
+        resp_plain = tg.send_message(
+            chat_id=chat_id,
+            message_thread_id=message_thread_id,
+            parse_mode=None,
+            message=plain,
+        )
+        return getattr(resp_plain, "status_code", 500) == 200
+
     escaped = _escape_markdown_v2(text)
     resp2 = tg.send_message(
         chat_id=chat_id,